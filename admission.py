@@ -0,0 +1,232 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Tuple
+
+from gec_page import Server, ServerResponse
+
+
+@dataclass(frozen=True)
+class AdmissionMetrics:
+    """
+    A point in time copy of the AdmissionController counters.
+
+    Parameters:
+        admitted (int): packets queued for processing
+        processed (int): admitted packets the Server has finished processing
+        shed_queue_full (int): packets answered RETRY_LATER because the queue of their LGA was full
+        shed_delay (int): packets answered RETRY_LATER because the expected queueing delay exceeded the target
+        shed_not_running (int): packets answered RETRY_LATER because the controller was not started or stopping
+        queued (int): packets currently waiting
+        queue_depths (Dict[str, int]): packets currently waiting per LGA (LGAs with an empty queue are left out)
+        service_time (float): the smoothed seconds the Server takes per packet
+        expected_delay (float): the seconds a packet admitted now is expected to wait before processing starts
+    """
+
+    admitted: int
+    processed: int
+    shed_queue_full: int
+    shed_delay: int
+    shed_not_running: int
+    queued: int
+    queue_depths: Dict[str, int]
+    service_time: float
+    expected_delay: float
+
+    @property
+    def shed(self) -> int:
+        return self.shed_queue_full + self.shed_delay + self.shed_not_running
+
+
+class AdmissionController:
+    """
+    Admission control in front of Server.process for bursts of packets (e.g. at polls closing). Packets are queued
+    per polling station and worker threads take one packet from each polling station with waiting packets in turn
+    (round robin), so a busy station cannot starve the others, in its own LGA or elsewhere. Rather than letting
+    latency grow without bound, a packet is answered with ServerResponse.RETRY_LATER straight away when its LGA
+    already has max_queue_per_lga packets waiting or, with a target_delay, when the expected wait (queued packets x
+    smoothed service time / workers) exceeds the target. A controller that is not running (not started yet, or
+    stopping) answers every packet with RETRY_LATER, as nothing would ever process it.
+
+    Parameters:
+        server (Server): the server packets are processed by, defaults to a Server of the current election
+        max_queue_per_lga (int): the most packets waiting per LGA
+        target_delay (float): optional queueing delay target in seconds
+        workers (int): the number of threads calling Server.process
+        smoothing (float): weight of the latest packet in the smoothed service time
+
+    Example:
+        >>> with AdmissionController(Server(), max_queue_per_lga=500, target_delay=0.25) as controller:
+        ...     future = controller.submit(packet)
+        >>> future.result()
+        <ServerResponse.ACCEPTED: 'ACCEPTED'>
+        >>> controller.metrics().shed
+        0
+    """
+
+    def __init__(
+        self,
+        server: Optional[Server] = None,
+        max_queue_per_lga: int = 1000,
+        target_delay: Optional[float] = None,
+        workers: int = 1,
+        smoothing: float = 0.2,
+    ):
+        if max_queue_per_lga < 1:
+            raise ValueError("max_queue_per_lga must be at least 1")
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.server = server if server is not None else Server()
+        self.max_queue_per_lga = max_queue_per_lga
+        self.target_delay = target_delay
+        self.workers = workers
+        self.smoothing = smoothing
+        # (lga, polling station) -> (packet, future) waiting, the stations with waiting packets in round robin order
+        # and the packets waiting per LGA
+        self._queues: Dict[Tuple[Optional[str], Optional[str]], Deque[Tuple[object, Future]]] = {}
+        self._ready: Deque[Tuple[Optional[str], Optional[str]]] = deque()
+        self._lga_depths: Dict[Optional[str], int] = {}
+        self._condition = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        self._queued = 0
+        self._admitted = 0
+        self._processed = 0
+        self._shed_queue_full = 0
+        self._shed_delay = 0
+        self._shed_not_running = 0
+        self._service_time = 0.0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        with self._condition:
+            if self._threads:
+                return
+            self._stopping = False
+            self._threads = [
+                threading.Thread(target=self._run, name=f"admission-{worker}", daemon=True)
+                for worker in range(self.workers)
+            ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, drain: bool = True):
+        """
+        stops the workers once the queues are empty, or with drain=False straight away, answering the packets
+        still waiting with RETRY_LATER
+        """
+        with self._condition:
+            self._stopping = True
+            if not drain:
+                for queue in self._queues.values():
+                    for _, future in queue:
+                        future.set_result(ServerResponse.RETRY_LATER)
+                self._queues.clear()
+                self._ready.clear()
+                self._lga_depths.clear()
+                self._queued = 0
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def submit(self, packet) -> Future:
+        """queues a packet, returning a Future of its ServerResponse (already RETRY_LATER if the packet was shed)"""
+        future: Future = Future()
+        lga = self.server.lga(packet)
+        key = (lga, self.server.polling_station(packet))
+        with self._condition:
+            if not self._threads or self._stopping:
+                self._shed_not_running += 1
+                future.set_result(ServerResponse.RETRY_LATER)
+                return future
+            if self._lga_depths.get(lga, 0) >= self.max_queue_per_lga:
+                self._shed_queue_full += 1
+                future.set_result(ServerResponse.RETRY_LATER)
+                return future
+            if self.target_delay is not None and self._expected_delay() > self.target_delay:
+                self._shed_delay += 1
+                future.set_result(ServerResponse.RETRY_LATER)
+                return future
+            queue = self._queues.get(key)
+            if queue is None:
+                queue = self._queues[key] = deque()
+                self._ready.append(key)
+            queue.append((packet, future))
+            self._lga_depths[lga] = self._lga_depths.get(lga, 0) + 1
+            self._queued += 1
+            self._admitted += 1
+            self._condition.notify()
+        return future
+
+    def process(self, packet) -> ServerResponse:
+        """submit and wait for the response, a drop in replacement for Server.process"""
+        return self.submit(packet).result()
+
+    def metrics(self) -> AdmissionMetrics:
+        with self._condition:
+            return AdmissionMetrics(
+                admitted=self._admitted,
+                processed=self._processed,
+                shed_queue_full=self._shed_queue_full,
+                shed_delay=self._shed_delay,
+                shed_not_running=self._shed_not_running,
+                queued=self._queued,
+                queue_depths={lga: depth for lga, depth in self._lga_depths.items() if depth},
+                service_time=self._service_time,
+                expected_delay=self._expected_delay(),
+            )
+
+    def _expected_delay(self) -> float:
+        """called holding the condition"""
+        return self._queued * self._service_time / self.workers
+
+    def _next(self) -> Optional[Tuple[object, Future]]:
+        """takes the next packet in round robin order across polling stations, None once stopping with nothing queued"""
+        with self._condition:
+            while not self._ready and not self._stopping:
+                self._condition.wait()
+            if not self._ready:
+                return None
+            key = self._ready.popleft()
+            queue = self._queues[key]
+            item = queue.popleft()
+            if queue:
+                self._ready.append(key)
+            else:
+                # stations come and go, keep only the queues with packets waiting
+                del self._queues[key]
+            self._lga_depths[key[0]] -= 1
+            self._queued -= 1
+            return item
+
+    def _run(self):
+        while True:
+            item = self._next()
+            if item is None:
+                return
+            packet, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            started = time.perf_counter()
+            try:
+                response = self.server.process(packet)
+            except Exception as error:
+                future.set_exception(error)
+            else:
+                future.set_result(response)
+            elapsed = time.perf_counter() - started
+            with self._condition:
+                self._processed += 1
+                if self._processed == 1:
+                    self._service_time = elapsed
+                else:
+                    self._service_time += self.smoothing * (elapsed - self._service_time)
@@ -2,11 +2,12 @@ from __future__ import annotations
 
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from pprint import pprint
-from typing import Dict, Optional, List
+from typing import Dict, Iterable, Optional, Set
 
+from election import Election, resolve_election
 from pco import PCO
 from political_party import Candidate, CandidateLevel
+from rejects import BulkVoteResult, RejectCode, RejectRecord
 from voter import Voter
 from authentication import AuthenticationError
 
@@ -14,6 +15,7 @@ from authentication import AuthenticationError
 @dataclass
 class AbstractArea(ABC):
     name: str
+    election: Optional[Election] = field(default=None, kw_only=True, repr=False, compare=False)
 
     @property
     @abstractmethod
@@ -23,20 +25,33 @@ class AbstractArea(ABC):
 
 class HierarchicalAreaNode(AbstractArea):
     def __post_init__(self):
-        from registries import AreaRegistry
-
-        self.area_registry_instance = AreaRegistry.get_or_create_registry_instance(self.name, self.__class__.__name__)
+        self.election = resolve_election(self.election)
+        # structural changes are logged under the tally lock like votes, so the replication log never holds a vote
+        # before the area or link it needs
+        with self.election.tally_lock:
+            self.area_registry_instance = self.election.area_registry.get_or_create_registry_instance(
+                self.name, self.__class__.__name__
+            )
+            if self.election.replication is not None:
+                self.election.replication.area_created(self.__class__.__name__, self.name)
 
     @property
     def candidates(self):
-        from registries import CandidateRegistry
-
-        return CandidateRegistry.get_for_area(self.name)
+        return self.election.candidate_registry.get_for_area(self.name)
 
     @abstractmethod
     def add_child(self, child: AbstractArea):
         ...
 
+    def _register_child(self, child: AbstractArea):
+        """persists the parent -> child edge in both the area registry and the integer area topology"""
+        with self.election.tally_lock:
+            self.area_registry_instance.add_entry(child)
+            self.election.area_registry.link(self, child)
+            replication = self.election.replication
+            if replication is not None:
+                replication.area_linked(self.__class__.__name__, self.name, child.__class__.__name__, child.name)
+
 
 class TerminalAreaNode(AbstractArea):
     parent: LocalGovernmentArea
@@ -74,7 +89,7 @@ class CountryArea(HierarchicalAreaNode):
     def add_child(self, child: AdministrativeArea):
         if not child.country_area:
             child.country_area = self
-            self.area_registry_instance.add_entry(child)
+            self._register_child(child)
             print(f"AA: {child.name} has been successfully added to Country Area: {self.name}")
         else:
             print(f"AA: {child.name} already has a Country Area: {child.country_area}")
@@ -107,7 +122,7 @@ class AdministrativeArea(HierarchicalAreaNode):
     def add_child(self, child: LocalGovernmentArea):
         if not child.administrative_area:
             child.administrative_area = self
-            self.area_registry_instance.add_entry(child)
+            self._register_child(child)
             print(f"lga: {child.name} has been successfully added to Administrative Area {self.name}")
         else:
             print(f"lga: {child.name} already has a Administrative Area: {child.administrative_area}")
@@ -121,7 +136,7 @@ class Constituency(HierarchicalAreaNode):
     def add_child(self, child: LocalGovernmentArea):
         if not child.constituency:
             child.constituency = self
-            self.area_registry_instance.add_entry(child)
+            self._register_child(child)
             print(f"lga: {child.name} has been successfully added to Constituency {self.name}")
         else:
             print(f"lga: {child.name} already has a Constituency: {child.constituency}")
@@ -154,7 +169,7 @@ class LocalGovernmentArea(HierarchicalAreaNode):
     def add_child(self, child: PollingStation):
         if not child.parent:
             child.parent = self
-            self.area_registry_instance.add_entry(child)
+            self._register_child(child)
             print(f"PS: {child.name} has been successfully added to LGA {self.name}")
         else:
             print(f"PS: {child.name} already has a LGA: {child.parent}")
@@ -198,6 +213,8 @@ class Ballot:
     """
     candidates: Candidates
     metadata: Metadata
+    election: Optional[Election] = field(default=None, repr=False, compare=False)
+    station: Optional[PollingStation] = field(default=None, repr=False, compare=False)
 
     def get_voting_card(self):
         """
@@ -225,7 +242,9 @@ class Ballot:
 
     @property
     def polling_station(self):
-        return PollingStation.from_metadata(self.metadata)
+        if self.station is not None:
+            return self.station
+        return PollingStation.from_metadata(self.metadata, election=self.election)
 
     def cast_votes(self, voter: Voter):
         """a method used to cast votes at a polling station"""
@@ -235,29 +254,38 @@ class Ballot:
         return True
 
     def validate_votes(self, voter):
-        """checks that the voters votes are valid for this ballot"""
+        """
+        checks that the voters votes are valid for this ballot, a vote that is not is recorded in the election's
+        reject log (UNKNOWN_LEVEL or NOT_ON_BALLOT) and returns False
+        """
+        if self.station is not None and self.station.parent is not None:
+            candidate_level_map = self.station.candidate_level_map
+        else:
+            candidate_level_map = self.candidates.candidate_level_map
         for level, candidate in voter.votes.items():
-            if candidate not in self.candidates.candidate_level_map[level].keys():
-                pprint(
-                    f"{candidate=} not on ballot. Available candidates are as follows: \n{self.candidates.candidate_level_map[level].keys()}"
-                )
+            candidates = candidate_level_map.get(level)
+            if candidates is None or candidate not in candidates:
+                code = RejectCode.UNKNOWN_LEVEL if candidates is None else RejectCode.NOT_ON_BALLOT
+                record = RejectRecord(self.metadata.lga, self.metadata.polling_station, voter.voter_id, code, level)
+                resolve_election(self.election).rejects.extend([record])
                 return False
         return True
 
     @classmethod
-    def from_metadata(cls, metadata):
-        ps = PollingStation.from_metadata(metadata)
-        ballot: cls = ps.get_ballot()
+    def from_metadata(cls, metadata, election: Optional[Election] = None):
+        ballot: cls = resolve_election(election).area_registry.get_ballot(metadata.lga, metadata.polling_station)
         return ballot
 
 
 @dataclass
 class PollingStation(TerminalAreaNode):
     pco: PCO
-    already_voted: dict[CandidateLevel, List[int]] = field(default_factory=dict)
+    already_voted: dict[CandidateLevel, Set[int]] = field(default_factory=dict)
     parent: Optional[LocalGovernmentArea] = field(default=None)
+    tallies: Dict[CandidateLevel, Dict[str, int]] = field(default_factory=dict)
 
     def __post_init__(self):
+        self.election = resolve_election(self.election)
         if not self.pco.polling_station:
             self.pco.polling_station = self.name
 
@@ -265,11 +293,9 @@ class PollingStation(TerminalAreaNode):
             raise ValueError("Cannot instantiate a polling station with un-matching PCO polling station")
 
     @classmethod
-    def from_metadata(cls, metadata):
-        from registries import AreaRegistry
-
-        lgas = AreaRegistry.get_or_create_registry_instance(metadata.lga, "LocalGovernmentArea").entries
-        polling_station: cls = lgas.get(metadata.polling_station)
+    def from_metadata(cls, metadata, election: Optional[Election] = None):
+        area_registry = resolve_election(election).area_registry
+        polling_station: cls = area_registry.get_polling_station(metadata.lga, metadata.polling_station)
         return polling_station
 
     def get_metadata(self):
@@ -279,13 +305,18 @@ class PollingStation(TerminalAreaNode):
         )
         return metadata
 
+    @property
+    def candidate_level_map(self) -> dict:
+        """the CandidateLevel -> {party: Candidate} map of this station, cached by the area registry"""
+        return self.election.area_registry.candidate_level_map(self)
+
     def get_ballot(self) -> Optional[Ballot]:
         if not self.parent:
             print("polling station not registered to a local government area: Returning None")
             return None
         metadata = self.get_metadata()
 
-        return Ballot(candidates=self.candidates, metadata=metadata)
+        return Ballot(candidates=self.candidates, metadata=metadata, election=self.election, station=self)
 
     def vote(self, voter: Voter):
         """
@@ -293,10 +324,13 @@ class PollingStation(TerminalAreaNode):
         Process
         1. check voter had a valid authenticaiton method (given authentication strategy)
         2. check the voter is registered at this polling station
-        3. iterate through the voters votes and
-           a) check that the voter has not already voted at this level (1 per CandidateLevel)
-           b) if this is fine. Leverage persistent CandidateRegistryInstance to increment votes on the candidate
-           c) add voter id to the already_voted dictionary given CandidateLevel
+        3. check that the voter has not already voted at any of the levels of their votes (1 per CandidateLevel),
+           nothing is counted unless every vote is valid
+        4. iterate through the voters votes and
+           a) Leverage persistent CandidateRegistryInstance to increment votes on the candidate
+              and increment this polling station's own tally for the party
+           b) add voter id to the already_voted dictionary given CandidateLevel
+        5. record the voter in the election's journal, if one is attached
         Parameters
             voter: a voter object that is used to check voting eligibility and execute votes
         """
@@ -307,46 +341,122 @@ class PollingStation(TerminalAreaNode):
                 f"voter not registered at this polling station. Please use polling station: {voter.polling_station_name}"
             )
 
-        for candidate_level, candidate_party in voter.votes.items():
-            if voter.voter_id in self.already_voted.get(candidate_level, []):
-                raise ValueError(f"candidate already voted in election {candidate_level}, skipping vote")
-            candidate = self.candidates.candidate_level_map.get(candidate_level)[candidate_party]
-            candidate.votes += 1
-            self.already_voted.setdefault(candidate_level, []).append(voter.voter_id)
-
+        with self.election.tally_lock:
+            candidate_level_map = self.candidate_level_map
+            for candidate_level, candidate_party in voter.votes.items():
+                if voter.voter_id in self.already_voted.get(candidate_level, ()):
+                    raise ValueError(f"candidate already voted in election {candidate_level}, skipping vote")
+                if candidate_party not in candidate_level_map.get(candidate_level):
+                    raise KeyError(f"{candidate_party} has no {candidate_level} candidate at this polling station")
+            self._count_voter(voter, candidate_level_map)
 
-def init_structure():
-    p_area = CountryArea("Gwugwuru")
+    def vote_many(self, voters: Iterable[Voter]) -> BulkVoteResult:
+        """
+        The bulk counterpart of vote, used when many voters are processed at once.
+        Invalid voters never raise or print: each voter is checked on every level before any of their votes are
+        counted, and a rejected voter becomes a RejectRecord (with a RejectCode) that is returned and added to the
+        election's reject log.
+        Parameters
+            voters: the voters to count at this polling station
+        Returns
+            BulkVoteResult with the number of voters counted and the reject records
+        """
+        lga = self.parent.name
+        accepted = 0
+        rejected = []
+        with self.election.tally_lock:
+            candidate_level_map = self.candidate_level_map
+            for voter in voters:
+                code, level = self._check_voter(voter, candidate_level_map)
+                if code is not None:
+                    rejected.append(RejectRecord(lga, self.name, voter.voter_id, code, level))
+                    continue
+                self._count_voter(voter, candidate_level_map)
+                accepted += 1
+        if rejected:
+            self.election.rejects.extend(rejected)
+        return BulkVoteResult(accepted=accepted, rejected=rejected)
+
+    def _count_voter(self, voter: Voter, candidate_level_map: dict):
+        """counts the (already validated) votes of a voter, called under the election's tally lock"""
+        for candidate_level, candidate_party in voter.votes.items():
+            candidate_level_map[candidate_level][candidate_party].votes += 1
+            level_tally = self.tallies.setdefault(candidate_level, {})
+            level_tally[candidate_party] = level_tally.get(candidate_party, 0) + 1
+            self.already_voted.setdefault(candidate_level, set()).add(voter.voter_id)
+        self.election.tally_changed(self.parent.name, self.name)
+        if self.election.journal is not None:
+            self.election.journal.record(self.parent.name, self.name, voter.voter_id, voter.votes)
+        if self.election.replication is not None:
+            self.election.replication.vote(self.parent.name, self.name, voter.voter_id, voter.votes)
+
+    def replay(self, voter: Voter):
+        """
+        counts a voter that was already validated and committed elsewhere (e.g. by a replication primary) without
+        any checks, voter.voter_id being the id the voter was committed under
+        """
+        with self.election.tally_lock:
+            self._count_voter(voter, self.candidate_level_map)
+
+    def _check_voter(self, voter: Voter, candidate_level_map: dict):
+        """returns the (RejectCode, CandidateLevel) a voter fails on, or (None, None) if every vote can be counted"""
+        if not voter.is_authenticated():
+            return RejectCode.AUTHENTICATION_FAILED, None
+        if voter.polling_station_name != self.name:
+            return RejectCode.WRONG_POLLING_STATION, None
+        for candidate_level, candidate_party in voter.votes.items():
+            candidates = candidate_level_map.get(candidate_level)
+            if candidates is None:
+                return RejectCode.UNKNOWN_LEVEL, candidate_level
+            if candidate_party not in candidates:
+                return RejectCode.NOT_ON_BALLOT, candidate_level
+            if voter.voter_id in self.already_voted.get(candidate_level, ()):
+                return RejectCode.ALREADY_VOTED, candidate_level
+        return None, None
+
+
+# a mapping used to pair candidate levels to area level classes (see utils.level_area_name_mapping for the names)
+level_area_mapping = {
+    CandidateLevel.PRESIDENT: CountryArea,
+    CandidateLevel.GOVERNOR: AdministrativeArea,
+    CandidateLevel.MAYOR: LocalGovernmentArea,
+    CandidateLevel.MP: Constituency,
+}
+
+
+def init_structure(election: Optional[Election] = None):
+    election = resolve_election(election)
+    p_area = CountryArea("Gwugwuru", election=election)
     aas = {}
     for i in range(5):
-        a_area = AdministrativeArea(f"AA{i}")
+        a_area = AdministrativeArea(f"AA{i}", election=election)
         p_area.add_child(a_area)
         aas[a_area.name] = a_area
-    c_area = Constituency(f"CS1")
-    c_area_2 = Constituency(f"CS2")
+    c_area = Constituency(f"CS1", election=election)
+    c_area_2 = Constituency(f"CS2", election=election)
     a_area = aas["AA1"]
     lgas = {}
     for i in range(5):
-        lg_area = LocalGovernmentArea(f"LGA{i}")
+        lg_area = LocalGovernmentArea(f"LGA{i}", election=election)
         a_area.add_child(lg_area)
         c_area.add_child(lg_area)
         lgas[lg_area.name] = lg_area
     a_area_2 = aas["AA2"]
     for i in range(5, 10, 1):
-        lg_area = LocalGovernmentArea(f"LGA{i}")
+        lg_area = LocalGovernmentArea(f"LGA{i}", election=election)
         a_area_2.add_child(lg_area)
         c_area_2.add_child(lg_area)
         lgas[lg_area.name] = lg_area
     lg_area = lgas["LGA1"]
     pss = {}
     for i in range(5):
-        ps = PollingStation(name=f"PS{i}", pco=PCO())
+        ps = PollingStation(name=f"PS{i}", pco=PCO(), election=election)
         lg_area.add_child(ps)
         pss[ps.name] = ps
     lg_area_2 = lgas["LGA5"]
     for i in range(5, 10, 1):
         ps_name = f"PS{i}"
-        ps = PollingStation(name=ps_name, pco=PCO())
+        ps = PollingStation(name=ps_name, pco=PCO(), election=election)
         lg_area_2.add_child(ps)
         pss[ps_name] = ps
 
@@ -0,0 +1,226 @@
+import json
+import mmap
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from authentication import NationalInsuranceNumber
+from election import Election, resolve_election
+from rejects import RejectCode
+from utils import str_level_map
+
+# (lga, polling station) -> {level name: (area name, parties on the ballot)}
+BallotSpec = Dict[Tuple[str, str], Dict[str, Tuple[str, FrozenSet[str]]]]
+# (lga, polling station, level name, party) -> votes
+CountKey = Tuple[str, str, str, str]
+
+
+@dataclass(frozen=True)
+class Discrepancy:
+    """a count that differs between the live tallies and the recount, area is the polling station for station rows"""
+
+    scope: str
+    lga: str
+    area: str
+    level: str
+    party: str
+    live: int
+    recount: int
+
+
+@dataclass
+class AuditReport:
+    """
+    The outcome of an audit recount.
+
+    Parameters:
+        records (int): the number of records read
+        counts (Dict[CountKey, int]): the recounted votes per polling station and party
+        rejects (Counter): the number of records rejected per RejectCode
+        discrepancies (List[Discrepancy]): every polling station and candidate whose live count differs
+    """
+
+    records: int = 0
+    counts: Dict[CountKey, int] = field(default_factory=dict)
+    rejects: Counter = field(default_factory=Counter)
+    discrepancies: List[Discrepancy] = field(default_factory=list)
+
+    @property
+    def certified(self) -> bool:
+        return not self.discrepancies
+
+
+def ballot_spec(election: Optional[Election] = None) -> BallotSpec:
+    """the picklable per polling station ballot of election, shipped to the recount workers"""
+    spec = {}
+    for lga, polling_station in resolve_election(election).area_registry.polling_stations():
+        levels = {}
+        for level, candidates in polling_station.candidates.candidate_level_map.items():
+            if candidates:
+                levels[level.name] = (next(iter(candidates.values())).area, frozenset(candidates))
+        spec[(lga, polling_station.name)] = levels
+    return spec
+
+
+def chunk_boundaries(path: str, chunks: int) -> List[Tuple[int, int]]:
+    """splits path into at most chunks byte ranges that each start and end on a record (line) boundary"""
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        boundaries = [0]
+        for i in range(1, chunks):
+            newline = mapped.find(b"\n", max(size * i // chunks, boundaries[-1]))
+            if newline == -1:
+                break
+            if newline + 1 > boundaries[-1]:
+                boundaries.append(newline + 1)
+        if boundaries[-1] != size:
+            boundaries.append(size)
+    return list(zip(boundaries, boundaries[1:]))
+
+
+def recount_chunk(path: str, start: int, end: int, spec: BallotSpec) -> tuple:
+    """
+    Recounts the records in path[start:end] with the rules of the live voting path:
+        - packets carrying an ID are authenticated (as the Server does with NationalInsuranceNumber)
+        - the polling station must exist, every level must be known and every party on the station's ballot
+        - a voter ((run_id, voter_id) for journal records, request_id for packets) counts at most once per level, a
+          record repeating an earlier vote is rejected as a whole
+    Records without a voter key are all distinct voters, as every packet is to the live Server, and are counted here.
+    Whether a record with a voter key repeats an earlier vote depends on every record before it, including those in
+    earlier chunks, so the valid ones are returned in file order for recount to count.
+
+    Returns
+        (records read, counts, rejects per code, [(lga, station, voter key, [(level name, party)])])
+    """
+    counts: Counter = Counter()
+    rejects: Counter = Counter()
+    keyed: List[tuple] = []
+    records = 0
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        mapped.seek(start)
+        while mapped.tell() < end:
+            line = mapped.readline()
+            if not line.strip():
+                continue
+            records += 1
+            record = json.loads(line)
+            code, votes = _check_record(record, spec)
+            if code is not None:
+                rejects[code] += 1
+                continue
+            lga, polling_station = record["LGA"], record["PC"]
+            voter_key = _voter_key(record)
+            if voter_key is not None:
+                keyed.append((lga, polling_station, voter_key, votes))
+                continue
+            for level_name, party in votes:
+                counts[(lga, polling_station, level_name, party)] += 1
+    return records, dict(counts), dict(rejects), keyed
+
+
+def _voter_key(record: dict):
+    """
+    the key a voter counts once under: voter ids restart in every process, so a journal record is keyed by the
+    run_id of the journal that wrote it as well (journals written before run ids fall back to the voter_id alone)
+    """
+    if "voter_id" in record:
+        return (record.get("run_id"), record["voter_id"])
+    return record.get("request_id")
+
+
+def _check_record(record: dict, spec: BallotSpec):
+    """
+    returns (RejectCode, None) for an invalid record, otherwise (None, [(level name, party)]), repeated votes are
+    left to recount
+    """
+    if "ID" in record and not NationalInsuranceNumber(record["ID"]).is_valid():
+        return RejectCode.AUTHENTICATION_FAILED, None
+    ballot = spec.get((record.get("LGA"), record.get("PC")))
+    if ballot is None:
+        return RejectCode.UNKNOWN_POLLING_STATION, None
+    votes = []
+    for level_str, party in record["votes"].items():
+        level = str_level_map.get(level_str)
+        if level is None:
+            return RejectCode.UNKNOWN_LEVEL, None
+        if level.name not in ballot or party not in ballot[level.name][1]:
+            return RejectCode.NOT_ON_BALLOT, None
+        votes.append((level.name, party))
+    return None, votes
+
+
+def recount(path: str, election: Optional[Election] = None, workers: Optional[int] = None) -> AuditReport:
+    """
+    Independently recounts a vote journal (see journal.VoteJournal) or a JSON lines file of ClientAPI.json_request
+    packets, and compares the recount with the live tallies of election. Votes that never pass through a polling
+    station (simulated or merged tallies) are not journaled and so show up as discrepancies.
+
+    The file is memory mapped and split into record aligned chunks that are recounted in parallel processes. Chunk
+    results are merged in file order and repeated votes are only decided while merging, so a record repeating an
+    earlier vote of its voter at any level is rejected as a whole as ALREADY_VOTED wherever the chunks fall: the
+    report does not depend on workers.
+
+    Parameters
+        path: the journal or packet file
+        election: the election holding the live tallies, defaults to the current election
+        workers: the number of recount processes, defaults to the number of cpus
+    Returns
+        AuditReport, with a Discrepancy for every polling station and candidate count that differs
+    """
+    election = resolve_election(election)
+    workers = workers or os.cpu_count() or 1
+    spec = ballot_spec(election)
+    report = AuditReport()
+    counts: Counter = Counter()
+    voted: Set[tuple] = set()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(recount_chunk, path, start, end, spec) for start, end in chunk_boundaries(path, workers)
+        ]
+        for future in futures:
+            records, chunk_counts, chunk_rejects, keyed = future.result()
+            report.records += records
+            counts.update(chunk_counts)
+            report.rejects.update(chunk_rejects)
+            for lga, polling_station, voter_key, votes in keyed:
+                if any((lga, polling_station, level_name, voter_key) in voted for level_name, _ in votes):
+                    report.rejects[RejectCode.ALREADY_VOTED] += 1
+                    continue
+                for level_name, party in votes:
+                    counts[(lga, polling_station, level_name, party)] += 1
+                    voted.add((lga, polling_station, level_name, voter_key))
+    report.counts = {key: votes for key, votes in counts.items() if votes}
+    report.discrepancies = _compare(report.counts, election, spec)
+    return report
+
+
+def _compare(counts: Dict[CountKey, int], election: Election, spec: BallotSpec) -> List[Discrepancy]:
+    discrepancies = []
+    live_counts = {}
+    with election.tally_lock:
+        for lga, polling_station in election.area_registry.polling_stations():
+            for level, party_tally in polling_station.tallies.items():
+                for party, votes in party_tally.items():
+                    live_counts[(lga, polling_station.name, level.name, party)] = votes
+        live_candidates = {
+            (candidate.level.name, candidate.area, candidate.party): candidate.votes
+            for candidate in election.candidate_registry.candidates()
+        }
+
+    for key in sorted(live_counts.keys() | counts.keys()):
+        live, recounted = live_counts.get(key, 0), counts.get(key, 0)
+        if live != recounted:
+            discrepancies.append(Discrepancy("station", key[0], key[1], key[2], key[3], live, recounted))
+
+    recount_candidates: Counter = Counter()
+    for (lga, polling_station, level_name, party), votes in counts.items():
+        recount_candidates[(level_name, spec[(lga, polling_station)][level_name][0], party)] += votes
+    for key in sorted(live_candidates.keys() | recount_candidates.keys()):
+        live, recounted = live_candidates.get(key, 0), recount_candidates.get(key, 0)
+        if live != recounted:
+            discrepancies.append(Discrepancy("candidate", "", key[1], key[0], key[2], live, recounted))
+    return discrepancies
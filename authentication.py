@@ -14,13 +14,20 @@ class AuthenticationStrategy(ABC):
     def authenticate(self):
         pass
 
+    def is_valid(self) -> bool:
+        """authenticates without any output, used by the bulk voting path"""
+        return self.authenticate()
+
 
 @dataclass
 class VoterIDCard(AuthenticationStrategy):
     id_card_no: int
 
+    def is_valid(self) -> bool:
+        return len(str(self.id_card_no)) == 13
+
     def authenticate(self):
-        if len(str(self.id_card_no)) != 13:
+        if not self.is_valid():
             print("authentication failed")
             return False
         print("authentication succeeded")
@@ -31,8 +38,11 @@ class VoterIDCard(AuthenticationStrategy):
 class NationalInsuranceNumber(AuthenticationStrategy):
     ni_number: str
 
+    def is_valid(self) -> bool:
+        return len(self.ni_number) == 9
+
     def authenticate(self):
-        if len(self.ni_number) != 9:
+        if not self.is_valid():
             print("authentication failed")
             return False
         print("authentication succeeded")
@@ -0,0 +1,247 @@
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from gec_page import Server, ServerResponse
+from rejects import RejectCode, RejectRecord
+from voter import Voter
+
+
+@dataclass
+class _StationBatch:
+    """the packets waiting for one polling station, oldest first"""
+
+    created_at: float
+    voters: List[Voter] = field(default_factory=list)
+    futures: List[Future] = field(default_factory=list)
+    request_ids: List[Optional[str]] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class BatchMetrics:
+    """
+    A point in time copy of the MicroBatcher counters.
+
+    Parameters:
+        batches (int): station batches flushed
+        packets (int): packets voted through the batches
+        batch_size (int): the current (adaptive) flush size
+        last_latency (float): seconds from the oldest packet of the last batch arriving to its batch being counted
+    """
+
+    batches: int
+    packets: int
+    batch_size: int
+    last_latency: float
+
+    @property
+    def mean_batch(self) -> float:
+        return self.packets / self.batches if self.batches else 0.0
+
+
+class MicroBatcher:
+    """
+    A scheduler in front of a Server that groups packets by polling station and counts each group with a single
+    PollingStation.vote_many call, paying the station lookup, candidate map build and tally lock once per group
+    rather than once per packet.
+
+    A group is flushed once it holds batch_size packets or its oldest packet has waited max_wait seconds. batch_size
+    adapts to the observed latency (additive increase, multiplicative decrease): it grows by one after every full batch
+    counted within target_latency of its oldest packet arriving and is halved after every batch that missed it.
+
+    Packets are parsed when submitted, so a malformed packet fails its own Future only. Responses follow
+    Server.process: DUPLICATE for a request id in the server's dedupe cache (reserved on submit, so this includes
+    packets still waiting in a batch), REJECTED for a voter vote_many rejected (see the election's reject log) and
+    ACCEPTED otherwise. If counting a batch raises, the voters not counted fail their Future with the exception and
+    the scheduler carries on with the next batch.
+
+    Parameters:
+        server (Server): provides the election, packet parsing, dedupe cache and profiler, defaults to a Server of
+            the current election
+        max_wait (float): the longest a packet waits for its group to fill, in seconds
+        target_latency (float): the latency the batch size is tuned towards, in seconds
+        batch_size (int): the initial flush size
+        min_batch (int): the smallest flush size
+        max_batch (int): the largest flush size
+
+    Example:
+        >>> with MicroBatcher(Server(), max_wait=0.002, target_latency=0.01) as batcher:
+        ...     futures = [batcher.submit(packet) for packet in packets]
+        >>> futures[0].result()
+        <ServerResponse.ACCEPTED: 'ACCEPTED'>
+    """
+
+    def __init__(
+        self,
+        server: Optional[Server] = None,
+        max_wait: float = 0.002,
+        target_latency: float = 0.01,
+        batch_size: int = 16,
+        min_batch: int = 1,
+        max_batch: int = 1024,
+    ):
+        if not 1 <= min_batch <= batch_size <= max_batch:
+            raise ValueError("batch sizes must satisfy 1 <= min_batch <= batch_size <= max_batch")
+        self.server = server if server is not None else Server()
+        self.max_wait = max_wait
+        self.target_latency = target_latency
+        self.batch_size = batch_size
+        self.min_batch = min_batch
+        self.max_batch = max_batch
+        self._batches: Dict[Tuple[str, str], _StationBatch] = {}
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._flushed_batches = 0
+        self._flushed_packets = 0
+        self._last_latency = 0.0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        with self._condition:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """flushes every waiting group and stops the scheduler thread"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, packet) -> Future:
+        """queues a packet for its polling station's next batch, returning a Future of its ServerResponse"""
+        future: Future = Future()
+        dedupe_cache = self.server.dedupe_cache
+        request_id = self.server.request_id(packet) if dedupe_cache is not None else None
+        # reserved now rather than when the batch is counted, so a retry of a packet still waiting is a DUPLICATE
+        if request_id is not None and not dedupe_cache.reserve(request_id):
+            future.set_result(ServerResponse.DUPLICATE)
+            return future
+        try:
+            metadata, voter = self.server.parse(packet)
+        except (KeyError, ValueError) as error:
+            if request_id is not None:
+                dedupe_cache.release(request_id)
+            future.set_exception(error)
+            return future
+        key = (metadata.lga, metadata.polling_station)
+        with self._condition:
+            batch = self._batches.get(key)
+            if batch is None:
+                batch = self._batches[key] = _StationBatch(created_at=time.monotonic())
+            batch.voters.append(voter)
+            batch.futures.append(future)
+            batch.request_ids.append(request_id)
+            if len(batch.voters) == 1 or len(batch.voters) >= self.batch_size:
+                # wake the scheduler for a new deadline or a full group
+                self._condition.notify()
+        return future
+
+    def metrics(self) -> BatchMetrics:
+        with self._condition:
+            return BatchMetrics(
+                batches=self._flushed_batches,
+                packets=self._flushed_packets,
+                batch_size=self.batch_size,
+                last_latency=self._last_latency,
+            )
+
+    def _due(self) -> Optional[List[Tuple[Tuple[str, str], _StationBatch]]]:
+        """waits for full or expired groups and takes them, None once stopping with nothing left to flush"""
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                if self._stopping:
+                    due = list(self._batches)
+                else:
+                    due = [
+                        key
+                        for key, batch in self._batches.items()
+                        if len(batch.voters) >= self.batch_size or now - batch.created_at >= self.max_wait
+                    ]
+                if due:
+                    return [(key, self._batches.pop(key)) for key in due]
+                if self._stopping:
+                    return None
+                if self._batches:
+                    next_deadline = min(batch.created_at for batch in self._batches.values()) + self.max_wait
+                    self._condition.wait(max(next_deadline - now, 0))
+                else:
+                    self._condition.wait()
+
+    def _run(self):
+        while True:
+            due = self._due()
+            if due is None:
+                return
+            for key, batch in due:
+                try:
+                    if self.server.profiler is None:
+                        self._flush(key, batch)
+                    else:
+                        self.server.profiler.call(self._flush, key, batch)
+                except Exception as error:
+                    # never let one batch stop the scheduler, its unresolved futures carry the error instead
+                    for future in batch.futures:
+                        if not future.done():
+                            future.set_exception(error)
+
+    def _flush(self, key: Tuple[str, str], batch: _StationBatch):
+        """votes one station batch, resolves its futures and adapts the batch size to the latency observed"""
+        election = self.server.election
+        polling_station = election.area_registry.get_polling_station(*key)
+        try:
+            if polling_station is None:
+                code = RejectCode.UNKNOWN_POLLING_STATION
+                rejected_ids = {voter.voter_id for voter in batch.voters}
+                election.rejects.extend(RejectRecord(*key, voter.voter_id, code) for voter in batch.voters)
+            else:
+                rejected_ids = {record.voter_id for record in polling_station.vote_many(batch.voters).rejected}
+        except Exception as error:
+            self._fail(polling_station, batch, error)
+            return
+
+        for voter, future in zip(batch.voters, batch.futures):
+            future.set_result(ServerResponse.REJECTED if voter.voter_id in rejected_ids else ServerResponse.ACCEPTED)
+
+        latency = time.monotonic() - batch.created_at
+        with self._condition:
+            self._flushed_batches += 1
+            self._flushed_packets += len(batch.voters)
+            self._last_latency = latency
+            if latency > self.target_latency:
+                self.batch_size = max(self.min_batch, self.batch_size // 2)
+            elif len(batch.voters) >= self.batch_size:
+                # only a group that filled up within the target says a larger group would be worth waiting for
+                self.batch_size = min(self.max_batch, self.batch_size + 1)
+
+    def _fail(self, polling_station, batch: _StationBatch, error: Exception):
+        """
+        resolves a batch whose vote_many raised part way: voters counted before the failure are ACCEPTED, the rest
+        fail with the error and their request ids are released so that a retry is processed
+        """
+        dedupe_cache = self.server.dedupe_cache
+        for voter, future, request_id in zip(batch.voters, batch.futures, batch.request_ids):
+            counted = polling_station is not None and any(
+                voter.voter_id in polling_station.already_voted.get(level, ()) for level in voter.votes
+            )
+            if counted:
+                future.set_result(ServerResponse.ACCEPTED)
+                continue
+            if request_id is not None:
+                dedupe_cache.release(request_id)
+            future.set_exception(error)
@@ -0,0 +1,115 @@
+"""
+Latency vs throughput of per packet Server.process against the MicroBatcher at a few max_wait settings.
+
+Simulated packets for every polling station of the demo election are offered at a fixed rate (or as fast as
+possible with --rate 0) and the latency of each packet is measured from submission to its response, e.g.
+    python benchmarks/bench_batching.py --packets 20000 --rate 20000
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+from typing import Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from areas import init_structure  # noqa: E402
+from batching import MicroBatcher  # noqa: E402
+from election import Election, use_election  # noqa: E402
+from gec_page import Server  # noqa: E402
+from political_party import init_candidates  # noqa: E402
+from simulation import ElectionSimulator  # noqa: E402
+
+
+def demo_election() -> Election:
+    election = Election("bench")
+    with use_election(election), contextlib.redirect_stdout(io.StringIO()):
+        init_structure()
+        init_candidates()
+    return election
+
+
+def packets_for(election: Election, count: int) -> List[dict]:
+    stations = election.topology.size("PollingStation")
+    simulator = ElectionSimulator(election, voters_per_station=-(-count // stations), seed=1)
+    packets = list(simulator.packets())[:count]
+    # interleave the stations, as packets from many terminals arrive mixed together
+    return [packet for offset in range(stations) for packet in packets[offset::stations]]
+
+
+def offer(packets: List[dict], rate: float, submit: Callable) -> List:
+    """submits packets at rate per second (0 = as fast as possible), returning (submitted at, result) per packet"""
+    submitted = []
+    start = time.perf_counter()
+    for number, packet in enumerate(packets):
+        if rate:
+            delay = start + number / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        submitted.append((time.perf_counter(), submit(packet)))
+    return submitted
+
+
+def report(label: str, latencies: List[float], elapsed: float):
+    latencies = sorted(latencies)
+    p99 = latencies[round(0.99 * (len(latencies) - 1))]
+    print(
+        f"  {label:<28} {len(latencies) / elapsed:10.0f} packets/s"
+        f"  p50 {statistics.median(latencies) * 1000:8.3f} ms  p99 {p99 * 1000:8.3f} ms"
+    )
+
+
+def run_server(packets: List[dict], rate: float):
+    server = Server(election=demo_election())
+    latencies = []
+
+    def submit(packet):
+        server.process(packet)
+        latencies.append(time.perf_counter())
+
+    start = time.perf_counter()
+    # the per packet path prints for every packet, keep that out of the measurement
+    with contextlib.redirect_stdout(io.StringIO()):
+        submitted = offer(packets, rate, submit)
+    elapsed = time.perf_counter() - start
+    report("Server.process", [done - at for (at, _), done in zip(submitted, latencies)], elapsed)
+
+
+def run_batcher(packets: List[dict], rate: float, max_wait: float, target_latency: float):
+    batcher = MicroBatcher(Server(election=demo_election()), max_wait=max_wait, target_latency=target_latency)
+    completed = {}
+
+    def submit(packet):
+        future = batcher.submit(packet)
+        future.add_done_callback(lambda done: completed.__setitem__(id(done), time.perf_counter()))
+        return future
+
+    start = time.perf_counter()
+    with batcher:
+        submitted = offer(packets, rate, submit)
+    elapsed = time.perf_counter() - start
+    metrics = batcher.metrics()
+    label = f"MicroBatcher wait={max_wait * 1000:g}ms"
+    report(label, [completed[id(future)] - at for at, future in submitted], elapsed)
+    print(f"  {'':<28} mean batch {metrics.mean_batch:.1f}, final batch_size {metrics.batch_size}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--packets", type=int, default=20_000)
+    parser.add_argument("--rate", type=float, default=0, help="packets offered per second, 0 = as fast as possible")
+    parser.add_argument("--target-latency", type=float, default=0.01, help="MicroBatcher target latency (seconds)")
+    args = parser.parse_args()
+
+    packets = packets_for(demo_election(), args.packets)
+    print(f"{len(packets)} packets, offered {'as fast as possible' if not args.rate else f'at {args.rate:g}/s'}")
+    run_server(packets, args.rate)
+    for max_wait in (0.0005, 0.002, 0.01):
+        run_batcher(packets, args.rate, max_wait, args.target_latency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Import time and cold start benchmark for the serving entry point (gec_page).
+
+Every measurement runs in a fresh interpreter so nothing is cached in sys.modules, e.g.
+    python benchmarks/bench_startup.py --runs 20
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ("candidate_level", "registries", "political_party", "areas", "results", "gec_page")
+
+COLD_START = """
+from areas import init_structure
+from gec_page import ClientAPI, Server
+from political_party import init_candidates
+
+init_structure()
+init_candidates()
+client_api = ClientAPI()
+packet = client_api.str_request("voter_name=John P, voter_id=123456789, pc=PS1, lga=LGA1, president_vote=PP1")
+client_api.send_request(Server(), packet)
+"""
+
+
+def run(args, **kwargs) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], cwd=REPO_ROOT, capture_output=True, text=True, check=True, **kwargs)
+
+
+def import_time_us(module: str) -> int:
+    """the cumulative import time of module as reported by -X importtime (microseconds)"""
+    stderr = run(["-X", "importtime", "-c", f"import {module}"]).stderr
+    for line in reversed(stderr.splitlines()):
+        _, _, cumulative, name = (part.strip() for part in line.replace("|", ":").split(":"))
+        if name == module:
+            return int(cumulative)
+    raise RuntimeError(f"{module} not found in -X importtime output")
+
+
+def wall_time_ms(code: str) -> float:
+    start = time.perf_counter()
+    run(["-c", code])
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"import time (median of {args.runs} fresh interpreters, -X importtime cumulative)")
+    for module in MODULES:
+        timings = [import_time_us(module) / 1000 for _ in range(args.runs)]
+        print(f"  {module:<16} {statistics.median(timings):8.2f} ms")
+
+    print(f"\nwall clock (median of {args.runs} runs, includes interpreter start up)")
+    scenarios = (("python -c pass", "pass"), ("import gec_page", "import gec_page"), ("first packet", COLD_START))
+    for label, code in scenarios:
+        timings = sorted(wall_time_ms(code) for _ in range(args.runs))
+        p90 = timings[round(0.9 * (len(timings) - 1))]
+        print(f"  {label:<16} {statistics.median(timings):8.2f} ms  (p90 {p90:.2f} ms)")
+
+
+if __name__ == "__main__":
+    main()
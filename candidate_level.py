@@ -0,0 +1,11 @@
+import enum
+
+
+@enum.unique
+class CandidateLevel(enum.Enum):
+    """The eligible candidate levels for GEC elections"""
+
+    PRESIDENT = enum.auto()
+    GOVERNOR = enum.auto()
+    MAYOR = enum.auto()
+    MP = enum.auto()
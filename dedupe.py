@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+class DedupeCache:
+    """
+    A bounded LRU record of the request ids a Server has already processed, used to acknowledge retried packets
+    without parsing or voting them again.
+
+    Parameters:
+        max_entries (int): the most request ids held at once, the least recently seen id is evicted beyond this
+            (bounds the memory held by the cache)
+        ttl (float): optional number of seconds after which a request id is forgotten (a time windowed cache)
+
+    Example:
+        >>> cache = DedupeCache(max_entries=2)
+        >>> cache.add("a")
+        >>> "a" in cache
+        True
+    """
+
+    def __init__(self, max_entries: int = 100_000, ttl: Optional[float] = None):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, request_id: Hashable) -> bool:
+        with self._lock:
+            added_at = self._entries.get(request_id)
+            if added_at is None:
+                return False
+            if self.ttl is not None and time.monotonic() - added_at >= self.ttl:
+                del self._entries[request_id]
+                return False
+            self._entries.move_to_end(request_id)
+            return True
+
+    def add(self, request_id: Hashable):
+        """records a processed request id, evicting expired then least recently seen ids to stay within bounds"""
+        now = time.monotonic()
+        with self._lock:
+            self._entries[request_id] = now
+            self._entries.move_to_end(request_id)
+            self._evict(now)
+
+    def reserve(self, request_id: Hashable) -> bool:
+        """
+        records request_id unless it is already held, in one step under the lock, so that of two copies of a packet
+        processed concurrently (e.g. a retry while the original is still in flight) only one is processed.
+
+        Returns
+            True if the id was recorded (process the packet), False if it was already held (a duplicate)
+        """
+        now = time.monotonic()
+        with self._lock:
+            added_at = self._entries.get(request_id)
+            if added_at is not None and (self.ttl is None or now - added_at < self.ttl):
+                self._entries.move_to_end(request_id)
+                return False
+            self._entries[request_id] = now
+            self._entries.move_to_end(request_id)
+            self._evict(now)
+            return True
+
+    def release(self, request_id: Hashable):
+        """forgets a reserved request id, e.g. because processing its packet failed and a retry should be processed"""
+        with self._lock:
+            self._entries.pop(request_id, None)
+
+    def _evict(self, now: float):
+        """called holding the lock"""
+        if self.ttl is not None:
+            while self._entries:
+                oldest_id, added_at = next(iter(self._entries.items()))
+                if now - added_at < self.ttl:
+                    break
+                del self._entries[oldest_id]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,95 @@
+import contextvars
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterator, Optional, Tuple
+
+from journal import VoteJournal
+from registries import AreaRegistry, CandidateRegistry
+from rejects import RejectLog
+
+if TYPE_CHECKING:
+    # replication builds on areas and political_party, which import this module
+    from replication import ReplicationLog
+
+
+class Election:
+    """
+    The context of a single election: owns its area registry (and so its topology), candidate registry, the lock
+    guarding its tallies, the log of votes rejected by the bulk voting path, an optional journal of committed
+    votes (see journal.VoteJournal) and an optional replication log streamed to a hot standby (see
+    replication.ReplicationLog). Areas, political parties, the Server
+    and get_results all take an optional election and fall back to the current one (see current_election), so
+    independent elections can live side by side in one process, e.g. for what-if simulations or isolated tests.
+
+    Parameters:
+        name (str): a label for the election
+
+    Example:
+        >>> election = Election("what-if")
+        >>> with use_election(election):
+        ...     init_structure()
+        ...     init_candidates()
+        >>> get_results(CandidateLevel.PRESIDENT, election=election)
+        {'Gwugwuru': 'HUNG_RESULT'}
+
+    Creating an Election only allocates empty dicts (the topology is built on first use), and discarding one frees
+    everything it registered, so thousands can be created and thrown away in one process.
+    """
+
+    def __init__(self, name: str = "default"):
+        self.name = name
+        self.area_registry = AreaRegistry()
+        self.candidate_registry = CandidateRegistry(self.area_registry)
+        self.tally_lock = threading.Lock()
+        # bumped (under tally_lock) by every change to the tallies, lets readers tell whether anything changed
+        self.tally_version = 0
+        # (lga, polling station) -> tally_version of the station's last change, least recently changed first, so
+        # readers can copy just the stations changed since the version they last read (see tally_changed)
+        self.station_changes: Dict[Tuple[str, str], int] = {}
+        self.rejects = RejectLog()
+        self.journal: Optional[VoteJournal] = None
+        self.replication: Optional["ReplicationLog"] = None
+        # node id -> the highest TallyDelta counters merged into this election (see tally_delta.DeltaMerger), kept
+        # here rather than on a merger so that every merger of this election agrees on what was already added
+        self.delta_counts: Dict[str, Dict[tuple, int]] = {}
+        self.delta_voted: Dict[str, Dict[tuple, int]] = {}
+
+    def __repr__(self):
+        return f"Election(name={self.name!r})"
+
+    def tally_changed(self, lga: str, polling_station: str):
+        """bumps tally_version for a change to the tallies of one polling station, called under tally_lock"""
+        self.tally_version += 1
+        key = (lga, polling_station)
+        self.station_changes.pop(key, None)
+        self.station_changes[key] = self.tally_version
+
+    @property
+    def topology(self):
+        """the integer indexed view of this election's area graph (see AreaRegistry.topology)"""
+        return self.area_registry.topology()
+
+
+_default_election = Election()
+_current_election: contextvars.ContextVar = contextvars.ContextVar("current_election", default=None)
+
+
+def current_election() -> Election:
+    """the election activated by use_election in this context, otherwise the process wide default election"""
+    election = _current_election.get()
+    return election if election is not None else _default_election
+
+
+def resolve_election(election: Optional[Election]) -> Election:
+    """returns election, or the current election if None"""
+    return election if election is not None else current_election()
+
+
+@contextmanager
+def use_election(election: Election) -> Iterator[Election]:
+    """makes election the current election for the duration of the with block (per thread / asyncio task)"""
+    token = _current_election.set(election)
+    try:
+        yield election
+    finally:
+        _current_election.reset(token)
@@ -0,0 +1,128 @@
+import csv
+import gzip
+import io
+import json
+from typing import Dict, Iterator, List, Optional
+
+from election import Election
+from results import get_winner
+from snapshots import ResultsSnapshot, SnapshotPublisher
+
+EXPORT_FIELDS = ("scope", "level", "lga", "area", "party", "votes", "result", "areas_won")
+EXPORT_FORMATS = ("csv", "jsonl")
+
+
+def iter_result_rows(snapshot: ResultsSnapshot) -> Iterator[dict]:
+    """
+    Lazily yields one export row per count of a ResultsSnapshot, in three scopes:
+        station: votes per party per polling station (only parties that received votes there)
+        area: votes per party for every area at the level's area class (NO_RESULT rows for areas without candidates)
+        level: total votes and number of areas won per party for the whole level
+    result holds the winner of the row's station/area (or HUNG_RESULT/NO_RESULT, see results.get_winner), at level
+    scope it is the party that won the most areas outright.
+    """
+    for (lga, name), station_tally in snapshot.station_tallies.items():
+        for level, party_tally in station_tally.items():
+            party_votes = {party: votes for party, votes in party_tally.items() if votes}
+            if not party_votes:
+                continue
+            result = get_winner(party_votes)
+            for party, votes in party_votes.items():
+                yield _row("station", level, lga, name, party, votes, result)
+
+    for level, area_names in snapshot.areas.items():
+        area_votes = snapshot.candidate_votes.get(level, {})
+        level_votes: Dict[str, int] = {}
+        areas_won: Dict[str, int] = {}
+        for area_name in area_names:
+            party_votes = area_votes.get(area_name, {})
+            result = get_winner(party_votes)
+            if result in party_votes:
+                areas_won[result] = areas_won.get(result, 0) + 1
+            if not party_votes:
+                yield _row("area", level, "", area_name, "", 0, result)
+            for party, votes in party_votes.items():
+                level_votes[party] = level_votes.get(party, 0) + votes
+                yield _row("area", level, "", area_name, party, votes, result)
+        result = get_winner(areas_won)
+        for party, votes in level_votes.items():
+            yield _row("level", level, "", "", party, votes, result, areas_won.get(party, 0))
+
+
+def export_results(
+    path: str,
+    fmt: str = "csv",
+    chunk_size: int = 10_000,
+    compress: bool = None,
+    election: Optional[Election] = None,
+    publisher: Optional[SnapshotPublisher] = None,
+) -> int:
+    """
+    Streams the full results to path as CSV or JSONL.
+
+    The rows are read from a ResultsSnapshot, so the export is consistent without holding the tally lock while it
+    is written. With the election's running SnapshotPublisher the export reads its latest snapshot (publishing one
+    first if the tallies changed, which copies only the changed stations) and keeps no copy of its own. Without
+    one a snapshot is taken for the export, holding only the nonzero counts. Rows are generated lazily and written
+    chunk_size rows at a time, so the export adds one chunk to memory however many polling stations there are.
+
+    Parameters
+        path: the file to write
+        fmt: "csv" or "jsonl"
+        chunk_size: the number of rows serialised per write
+        compress: gzip the output, defaults to True when path ends with .gz
+        election: the election to export, defaults to the current election (or the publisher's election)
+        publisher: a SnapshotPublisher of the election to read the snapshot from
+    Returns
+        the number of rows written
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"unsupported export format {fmt}, please use one of {EXPORT_FORMATS}")
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    if compress is None:
+        compress = path.endswith(".gz")
+
+    snapshot = (publisher if publisher is not None else SnapshotPublisher(election)).publish()
+    opener = gzip.open if compress else open
+    rows_written = 0
+    with opener(path, "wt", newline="") as f:
+        if fmt == "csv":
+            csv.writer(f).writerow(EXPORT_FIELDS)
+        for chunk in _chunks(iter_result_rows(snapshot), chunk_size):
+            f.write(_serialise(chunk, fmt))
+            rows_written += len(chunk)
+    return rows_written
+
+
+def _row(scope, level, lga, area, party, votes, result, areas_won=None) -> dict:
+    return {
+        "scope": scope,
+        "level": level.name,
+        "lga": lga,
+        "area": area,
+        "party": party,
+        "votes": votes,
+        "result": result,
+        "areas_won": areas_won,
+    }
+
+
+def _chunks(rows: Iterator[dict], chunk_size: int) -> Iterator[List[dict]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _serialise(chunk: List[dict], fmt: str) -> str:
+    if fmt == "jsonl":
+        return "".join(json.dumps(row) + "\n" for row in chunk)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writerows(chunk)
+    return buffer.getvalue()
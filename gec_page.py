@@ -1,36 +1,64 @@
+import enum
 from abc import ABC, abstractmethod
 from fnmatch import fnmatch
 from functools import singledispatchmethod
+from typing import Optional, Tuple
 
-from areas import Metadata, Ballot, init_structure
+from areas import Metadata
 from authentication import NationalInsuranceNumber
-from political_party import CandidateLevel, init_candidates
-from results import get_results
+from candidate_level import CandidateLevel
+from dedupe import DedupeCache
+from election import Election, resolve_election
+from profiling import ServingProfiler, default_profiler
+from rejects import RejectCode, RejectRecord
+from utils import str_level_map
 from voter import Voter
 
 
+class ServerResponse(enum.Enum):
+    """The acknowledgement returned to a client for each packet"""
+
+    ACCEPTED = "ACCEPTED"
+    DUPLICATE = "DUPLICATE"
+    REJECTED = "REJECTED"
+    RETRY_LATER = "RETRY_LATER"
+
+
 class Command(ABC):
+    def __init__(self, election: Optional[Election] = None):
+        self.election = resolve_election(election)
+
     @abstractmethod
-    def execute(self, data):
+    def parse(self, data) -> Tuple[Metadata, Voter]:
+        """the polling station metadata and the voter (with their votes) of a packet"""
         ...
 
+    def execute(self, data):
+        return self.cast_vote(*self.parse(data))
+
     @property
     def str_level_map(self):
-        return {
-            "president": CandidateLevel.PRESIDENT,
-            "mp": CandidateLevel.MP,
-            "mayor": CandidateLevel.MAYOR,
-            "governor": CandidateLevel.GOVERNOR,
-        }
+        return str_level_map
 
-    def cast_vote(self, metadata, voter):
-        ballot = Ballot.from_metadata(metadata)
-        ballot.cast_votes(voter)
+    def cast_vote(self, metadata, voter) -> bool:
+        """
+        casts the voter's votes on the reused ballot of their polling station (see AreaRegistry.get_ballot), an
+        unknown polling station is recorded in the election's reject log and returns False
+        """
+        ballot = self.election.area_registry.get_ballot(metadata.lga, metadata.polling_station)
+        if ballot is None:
+            code = RejectCode.UNKNOWN_POLLING_STATION
+            self.election.rejects.extend([RejectRecord(metadata.lga, metadata.polling_station, voter.voter_id, code)])
+            return False
+        return ballot.cast_votes(voter)
 
 
 class JsonDataCommand(Command):
     def execute(self, data):
         print("Executing command for JSON data")
+        return super().execute(data)
+
+    def parse(self, data) -> Tuple[Metadata, Voter]:
         metadata = Metadata(lga=data["LGA"], polling_station=data["PC"])
         voter = Voter(
             polling_station_name=data["PC"],
@@ -38,11 +66,11 @@ class JsonDataCommand(Command):
             authentication_strategy=NationalInsuranceNumber(data["ID"]),
         )
         voter.votes = {self.str_level_map.get(k): v for k, v in data["votes"].items()}
-        self.cast_vote(metadata, voter)
+        return metadata, voter
 
 
 class StrDataCommand(Command):
-    def execute(self, data):
+    def parse(self, data) -> Tuple[Metadata, Voter]:
         split_string = data.split(",")
         parsed_data = {}
         for pair in split_string:
@@ -61,35 +89,147 @@ class StrDataCommand(Command):
             authentication_strategy=NationalInsuranceNumber(parsed_data["voter_id"]),
         )
         voter.votes = votes
-        self.cast_vote(metadata, voter)
+        return metadata, voter
 
 
 class Server:
+    """
+    Receives vote packets from the ClientAPI and dispatches them to the Command for their dtype. Packets for an
+    unknown polling station, or with a vote for a party not on the ballot, are acknowledged as REJECTED.
+
+    Parameters:
+        election (Election): the election votes are cast in, defaults to the current election
+        dedupe_cache (DedupeCache): optional cache of processed request ids. When given, packets carrying a
+            request_id that has already been processed or is still being processed (e.g. a terminal retrying after
+            a timeout) are acknowledged as DUPLICATE before any parsing or voting takes place.
+        profiler (ServingProfiler): optional profiler wrapped around the command dispatch and voting path,
+            defaults to the process wide profiler (see profiling.default_profiler) which is None unless enabled
+    """
+
+    def __init__(
+        self,
+        election: Optional[Election] = None,
+        dedupe_cache: Optional[DedupeCache] = None,
+        profiler: Optional[ServingProfiler] = None,
+    ):
+        self.election = resolve_election(election)
+        self.dedupe_cache = dedupe_cache
+        self.profiler = profiler if profiler is not None else default_profiler()
+
+    def process(self, data) -> ServerResponse:
+        request_id = self.request_id(data) if self.dedupe_cache is not None else None
+        # reserved before dispatch so a retry arriving while the original is still in flight is a DUPLICATE
+        if request_id is not None and not self.dedupe_cache.reserve(request_id):
+            return ServerResponse.DUPLICATE
+        try:
+            if self.profiler is None:
+                accepted = self.dispatch(data)
+            else:
+                accepted = self.profiler.call(self.dispatch, data)
+        except Exception:
+            if request_id is not None:
+                self.dedupe_cache.release(request_id)
+            raise
+        return ServerResponse.ACCEPTED if accepted else ServerResponse.REJECTED
+
     @singledispatchmethod
-    def process(self, data):
+    def dispatch(self, data):
         raise NotImplementedError("please create a method to handle your dtype")
 
-    @process.register
+    @dispatch.register
     def _(self, data: dict):
-        JsonDataCommand().execute(data)
+        return JsonDataCommand(self.election).execute(data)
 
-    @process.register
+    @dispatch.register
     def _(self, data: str):
-        StrDataCommand().execute(data)
+        return StrDataCommand(self.election).execute(data)
+
+    @singledispatchmethod
+    def parse(self, data) -> Tuple[Metadata, Voter]:
+        """parses a packet without casting its votes, used by batching front ends (see batching.MicroBatcher)"""
+        raise NotImplementedError("please create a method to handle your dtype")
 
+    @parse.register
+    def _(self, data: dict) -> Tuple[Metadata, Voter]:
+        return JsonDataCommand(self.election).parse(data)
 
-class ClientAPI:
-    def json_request(self, voter_name: str, voter_id: str, pc: str, lga: str, votes: dict) -> dict:
-        return {"voter_name": voter_name, "ID": voter_id, "PC": pc, "LGA": lga, "votes": votes}
+    @parse.register
+    def _(self, data: str) -> Tuple[Metadata, Voter]:
+        return StrDataCommand(self.election).parse(data)
+
+    @singledispatchmethod
+    def request_id(self, data) -> Optional[str]:
+        """extracts the request id of a packet without parsing the rest of it"""
+        return None
 
-    def str_request(self, str_data: str) -> str:
+    @request_id.register
+    def _(self, data: dict) -> Optional[str]:
+        return data.get("request_id")
+
+    @request_id.register
+    def _(self, data: str) -> Optional[str]:
+        return _str_packet_field(data, "request_id")
+
+    @singledispatchmethod
+    def lga(self, data) -> Optional[str]:
+        """extracts the local government area of a packet without parsing the rest of it"""
+        return None
+
+    @lga.register
+    def _(self, data: dict) -> Optional[str]:
+        return data.get("LGA")
+
+    @lga.register
+    def _(self, data: str) -> Optional[str]:
+        return _str_packet_field(data, "lga")
+
+    @singledispatchmethod
+    def polling_station(self, data) -> Optional[str]:
+        """extracts the polling station of a packet without parsing the rest of it"""
+        return None
+
+    @polling_station.register
+    def _(self, data: dict) -> Optional[str]:
+        return data.get("PC")
+
+    @polling_station.register
+    def _(self, data: str) -> Optional[str]:
+        return _str_packet_field(data, "pc")
+
+
+def _str_packet_field(data: str, key: str) -> Optional[str]:
+    """the value of key in a "k=v, k=v" packet, None if absent"""
+    start = data.find(f"{key}=")
+    if start == -1:
+        return None
+    end = data.find(",", start)
+    return data[start + len(key) + 1:end if end != -1 else None].strip()
+
+
+class ClientAPI:
+    def json_request(
+        self, voter_name: str, voter_id: str, pc: str, lga: str, votes: dict, request_id: Optional[str] = None
+    ) -> dict:
+        packet = {"voter_name": voter_name, "ID": voter_id, "PC": pc, "LGA": lga, "votes": votes}
+        if request_id is not None:
+            packet["request_id"] = request_id
+        return packet
+
+    def str_request(self, str_data: str, request_id: Optional[str] = None) -> str:
+        if request_id is not None:
+            return f"{str_data}, request_id={request_id}"
         return str_data
 
-    def send_request(self, server: Server, packet):
-        server.process(packet)
+    def send_request(self, server: Server, packet) -> ServerResponse:
+        return server.process(packet)
 
 
 if __name__ == "__main__":
+    # the demo election is only needed when run as a script, worker processes importing the Server skip it
+    from areas import init_structure
+    from political_party import init_candidates
+    from results import get_results
+
     init_structure()
     init_candidates()
     server = Server()
@@ -0,0 +1,71 @@
+import json
+import threading
+import uuid
+from typing import Dict, Optional
+
+from candidate_level import CandidateLevel
+from utils import level_str_map
+
+
+class VoteJournal:
+    """
+    An append only JSON lines log of committed votes. Attach one to an election (election.journal = VoteJournal(path))
+    and every voter counted by PollingStation.vote or PollingStation.vote_many is written as one line, in commit
+    order, in the same shape as a ClientAPI.json_request packet:
+
+    {"LGA": "LGA1", "PC": "PS1", "run_id": "5f0c...", "voter_id": 42, "votes": {"president": "PP1"}}
+
+    so that the journal (or a raw packet file) can be recounted independently, see audit.recount. Voter ids restart
+    at 0 in every process, so each line also carries the run_id of the journal that wrote it and a voter is
+    identified by (run_id, voter_id): a journal appended to after a restart, or by several nodes, recounts correctly.
+
+    Parameters:
+        path (str): the journal file, appended to if it exists
+        flush_every (int): write the buffered lines to disk every flush_every records
+        run_id (str): identifies this writer in the journal, defaults to a random uuid
+    """
+
+    def __init__(self, path: str, flush_every: int = 1000, run_id: Optional[str] = None):
+        self.path = path
+        self.flush_every = flush_every
+        self.run_id = run_id if run_id is not None else uuid.uuid4().hex
+        self._file = open(path, "a", encoding="utf-8")
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def record(self, lga: str, polling_station: str, voter_id: int, votes: Dict[CandidateLevel, str]):
+        """appends one committed voter (called under the election's tally lock)"""
+        line = json.dumps(
+            {
+                "LGA": lga,
+                "PC": polling_station,
+                "run_id": self.run_id,
+                "voter_id": voter_id,
+                "votes": {level_str_map[level]: party for level, party in votes.items()},
+            }
+        )
+        with self._lock:
+            self._file.write(line + "\n")
+            self._pending += 1
+            if self._pending >= self.flush_every:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._flush()
+                self._file.close()
+
+    def _flush(self):
+        self._file.flush()
+        self._pending = 0
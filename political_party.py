@@ -1,15 +1,14 @@
-import enum
+import csv
+import json
 from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
 
+from candidate_level import CandidateLevel
+from election import Election, resolve_election
+from registries import CandidateRegistrationError
+from utils import str_level_map
 
-@enum.unique
-class CandidateLevel(enum.Enum):
-    """The eligible candidate levels for GEC elections"""
-
-    PRESIDENT = enum.auto()
-    GOVERNOR = enum.auto()
-    MAYOR = enum.auto()
-    MP = enum.auto()
+CANDIDATE_FIELDS = ("party", "level", "area", "name")
 
 
 @dataclass
@@ -38,6 +37,7 @@ class PoliticalParty:
 
     Parameters:
         party_name (str): The name of the political party.
+        election (Election): The election the party stands in, defaults to the current election.
 
     Attributes:
         party_name (str): The name of the political party.
@@ -51,6 +51,9 @@ class PoliticalParty:
         register(candidate: Candidate):
             Registers a candidate with the political party and adds them to the CandidateRegistry.
 
+        register_many(candidates: Iterable[Candidate]):
+            Registers a batch of candidates atomically, reporting every invalid candidate at once.
+
     Example:
         >>> party = PoliticalParty("PP1")
         >>> candidate = Candidate(level=CandidateLevel.PRESIDENT, name="John Doe", area="Gwugwuru")
@@ -60,11 +63,13 @@ class PoliticalParty:
     """
 
     party_name: str
+    election: Optional[Election] = field(default=None, kw_only=True, repr=False, compare=False)
 
     def __post_init__(self):
-        from registries import CandidateRegistry
-
-        self.candidate_registry_instance = CandidateRegistry.get_or_create_registry_instance(party=self.party_name)
+        self.election = resolve_election(self.election)
+        self.candidate_registry_instance = self.election.candidate_registry.get_or_create_registry_instance(
+            party=self.party_name
+        )
 
     def register(self, candidate: Candidate):
         """
@@ -78,15 +83,90 @@ class PoliticalParty:
         """
         if not candidate.party:
             candidate.party = self.party_name
-            self.candidate_registry_instance.add_entry(candidate)
+            # logged under the tally lock like votes, so no vote for the candidate is logged before it
+            with self.election.tally_lock:
+                self.candidate_registry_instance.add_entry(candidate)
+                if self.election.replication is not None:
+                    self.election.replication.candidates_registered([candidate])
+
+    def register_many(self, candidates: Iterable[Candidate]):
+        """
+        Registers a batch of candidates with the political party in one pass: the areas and duplicates of the whole
+        batch are validated up front and either every candidate is registered or none is.
 
+        Parameters:
+            candidates (Iterable[Candidate]): The candidates to be registered.
 
-def init_candidates():
+        raises
+            CandidateRegistrationError: listing every invalid candidate (unknown area, a second candidate for the
+                same area, or a candidate already registered with a party)
+        """
+        candidates = list(candidates)
+        errors = [
+            f"{candidate.name} is already registered for {candidate.party}"
+            for candidate in candidates
+            if candidate.party
+        ]
+        errors += self.candidate_registry_instance.validate_entries(candidates)
+        if errors:
+            raise CandidateRegistrationError(errors)
+        for candidate in candidates:
+            candidate.party = self.party_name
+        with self.election.tally_lock:
+            self.candidate_registry_instance.add_entries(candidates)
+            if self.election.replication is not None:
+                self.election.replication.candidates_registered(candidates)
+
+
+def load_candidates(path: str, election: Optional[Election] = None) -> Dict[str, List[Candidate]]:
+    """
+    Registers the candidates listed in a CSV (with a party,level,area,name header) or JSON lines file (one
+    {"party", "level", "area", "name"} object per line, chosen by the .jsonl / .json extension). Levels use the
+    packet names ("president", "governor", "mayor", "mp").
+
+    The whole file is validated before anything is registered, so a file with any invalid row registers nothing.
+
+    Returns
+        the registered candidates per party
+
+    raises
+        CandidateRegistrationError: listing every invalid row of the file
+    """
+    election = resolve_election(election)
+    with open(path, newline="", encoding="utf-8") as file:
+        if path.endswith((".jsonl", ".json")):
+            rows = [json.loads(line) for line in file if line.strip()]
+        else:
+            rows = list(csv.DictReader(file))
+
+    errors = []
+    candidates_per_party: Dict[str, List[Candidate]] = {}
+    for row_number, row in enumerate(rows, start=1):
+        missing = [key for key in CANDIDATE_FIELDS if not row.get(key)]
+        level = str_level_map.get(str(row.get("level", "")).lower())
+        if missing or level is None:
+            problem = f"missing {', '.join(missing)}" if missing else f"unknown level {row['level']}"
+            errors.append(f"row {row_number}: {problem}")
+            continue
+        candidate = Candidate(level=level, area=row["area"], name=row["name"])
+        candidates_per_party.setdefault(row["party"], []).append(candidate)
+
+    for party, candidates in candidates_per_party.items():
+        errors += [f"{party}: {error}" for error in election.candidate_registry.validate_entries(party, candidates)]
+    if errors:
+        raise CandidateRegistrationError(errors)
+
+    for party, candidates in candidates_per_party.items():
+        PoliticalParty(party_name=party, election=election).register_many(candidates)
+    return candidates_per_party
+
+
+def init_candidates(election: Optional[Election] = None):
     candidate = Candidate(level=CandidateLevel.PRESIDENT, name="John Doe", area="Gwugwuru")
     candidate_1 = Candidate(level=CandidateLevel.MP, name="James B", area="CS2")
     candidate_2 = Candidate(level=CandidateLevel.PRESIDENT, name="Tim D", area="Gwugwuru")
-    party = PoliticalParty(party_name="PP1")
-    party_2 = PoliticalParty(party_name="PP2")
+    party = PoliticalParty(party_name="PP1", election=election)
+    party_2 = PoliticalParty(party_name="PP2", election=election)
     party.register(candidate)
     party.register(candidate_1)
     party_2.register(candidate_2)
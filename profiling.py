@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, List, Optional
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+# environment variables used to switch profiling on for a live process, e.g.
+# GEC_PROFILE=1 GEC_PROFILE_DIR=/tmp/gec-profiles GEC_PROFILE_INTERVAL=30 python gec_page.py
+PROFILE_ENV = "GEC_PROFILE"
+PROFILE_DIR_ENV = "GEC_PROFILE_DIR"
+PROFILE_INTERVAL_ENV = "GEC_PROFILE_INTERVAL"
+PROFILE_KEEP_ENV = "GEC_PROFILE_KEEP"
+PROFILE_MEMORY_ENV = "GEC_PROFILE_MEMORY"
+
+
+class ServingProfiler:
+    """
+    Collects cProfile statistics (and optionally tracemalloc snapshots) for the calls it wraps, and rotates them to
+    disk every interval seconds.
+
+    Each dump writes a pair of files named after the dump time:
+        profile-<timestamp>.prof: load with pstats.Stats(path) or snakeviz
+        tracemalloc-<timestamp>.snapshot: load with tracemalloc.Snapshot.load(path)
+    only the newest keep pairs are kept in directory.
+
+    Parameters:
+        directory (str): where dumps are written (created if missing)
+        interval (float): seconds between dumps
+        keep (int): the number of dumps to keep on disk
+        trace_memory (bool): take tracemalloc snapshots alongside the cpu profile
+        frames (int): the traceback depth recorded by tracemalloc per allocation
+
+    Profiled calls are serialised by a lock (a cProfile.Profile can only profile one thread at a time), which is
+    an acceptable cost while investigating and never paid when profiling is disabled.
+
+    cProfile, tracemalloc and pathlib are imported when a profiler is created rather than with this module, so that
+    importing the Server does not load them unless profiling is switched on.
+    """
+
+    def __init__(
+        self, directory: str, interval: float = 60.0, keep: int = 10, trace_memory: bool = True, frames: int = 1
+    ):
+        import cProfile
+        import tracemalloc
+        from pathlib import Path
+
+        self._cprofile = cProfile
+        self._tracemalloc = tracemalloc
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.interval = interval
+        self.keep = keep
+        self.trace_memory = trace_memory
+        self._profile = self._cprofile.Profile()
+        self._calls = 0
+        self._lock = threading.Lock()
+        self._next_dump = time.monotonic() + interval
+        self._started_tracemalloc = False
+        if trace_memory and not self._tracemalloc.is_tracing():
+            self._tracemalloc.start(frames)
+            self._started_tracemalloc = True
+
+    @classmethod
+    def from_env(cls) -> Optional["ServingProfiler"]:
+        """returns a profiler configured from the GEC_PROFILE_* environment variables, or None if not enabled"""
+        if os.environ.get(PROFILE_ENV, "").lower() not in ("1", "true", "yes"):
+            return None
+        return cls(
+            directory=os.environ.get(PROFILE_DIR_ENV, "gec-profiles"),
+            interval=float(os.environ.get(PROFILE_INTERVAL_ENV, 60.0)),
+            keep=int(os.environ.get(PROFILE_KEEP_ENV, 10)),
+            trace_memory=os.environ.get(PROFILE_MEMORY_ENV, "1").lower() in ("1", "true", "yes"),
+        )
+
+    def call(self, func: Callable, *args, **kwargs):
+        """runs func under the profiler, dumping to disk if the rotation interval has elapsed"""
+        with self._lock:
+            self._calls += 1
+            self._profile.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._profile.disable()
+                if time.monotonic() >= self._next_dump:
+                    self._dump()
+
+    def dump(self) -> List[Path]:
+        """writes the statistics gathered so far to disk (nothing if no calls were profiled) and starts a new period"""
+        with self._lock:
+            return self._dump()
+
+    def close(self):
+        """writes a final dump and stops memory tracing if this profiler started it"""
+        self.dump()
+        if self._started_tracemalloc:
+            self._tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def _dump(self) -> List[Path]:
+        self._next_dump = time.monotonic() + self.interval
+        if not self._calls:
+            return []
+        timestamp = time.strftime("%Y%m%d-%H%M%S") + f"-{time.time_ns() % 1_000_000_000:09d}"
+        paths = [self.directory / f"profile-{timestamp}.prof"]
+        self._profile.dump_stats(paths[0])
+        self._profile = self._cprofile.Profile()
+        self._calls = 0
+        if self.trace_memory and self._tracemalloc.is_tracing():
+            paths.append(self.directory / f"tracemalloc-{timestamp}.snapshot")
+            self._tracemalloc.take_snapshot().dump(str(paths[1]))
+        self._rotate()
+        return paths
+
+    def _rotate(self):
+        for pattern in ("profile-*.prof", "tracemalloc-*.snapshot"):
+            dumps = sorted(self.directory.glob(pattern))
+            for stale in dumps[: max(len(dumps) - self.keep, 0)]:
+                stale.unlink()
+
+
+_default_profiler: Optional[ServingProfiler] = None
+_default_profiler_loaded = False
+
+
+def default_profiler() -> Optional[ServingProfiler]:
+    """the process wide profiler used by Server when none is passed, None when profiling is disabled"""
+    global _default_profiler, _default_profiler_loaded
+    if not _default_profiler_loaded:
+        _default_profiler = ServingProfiler.from_env()
+        _default_profiler_loaded = True
+    return _default_profiler
+
+
+def enable_profiling(directory: str, interval: float = 60.0, keep: int = 10, trace_memory: bool = True):
+    """switches profiling on for every Server created afterwards"""
+    global _default_profiler, _default_profiler_loaded
+    disable_profiling()
+    _default_profiler = ServingProfiler(directory=directory, interval=interval, keep=keep, trace_memory=trace_memory)
+    _default_profiler_loaded = True
+    return _default_profiler
+
+
+def disable_profiling():
+    """writes a final dump of the process wide profiler and switches profiling off for Servers created afterwards"""
+    global _default_profiler, _default_profiler_loaded
+    if _default_profiler is not None:
+        _default_profiler.close()
+    _default_profiler = None
+    _default_profiler_loaded = True
@@ -1,9 +1,29 @@
+from __future__ import annotations
+
 from abc import abstractmethod
 from dataclasses import dataclass, field
-from typing import Dict, Optional, List, Any
-from areas import AbstractArea
-from political_party import Candidate
-from utils import level_area_mapping
+from typing import TYPE_CHECKING, Dict, Iterator, Optional, List, Any, Tuple
+
+from utils import level_area_name_mapping
+
+if TYPE_CHECKING:
+    # only needed for annotations, importing them at runtime would make registries <-> areas/political_party circular
+    from areas import AbstractArea, Ballot, PollingStation
+    from political_party import Candidate
+    from topology import AreaTopology
+
+
+class CandidateRegistrationError(ValueError):
+    """
+    Raised by the bulk candidate registration path with every problem found in the batch, nothing is registered.
+
+    Parameters:
+        errors (List[str]): one message per invalid candidate
+    """
+
+    def __init__(self, errors: List[str]):
+        super().__init__(f"{len(errors)} invalid candidate(s): " + "; ".join(errors))
+        self.errors = errors
 
 
 class BaseRegistryInstance:
@@ -57,7 +77,8 @@ class CandidateRegistryInstance(BaseRegistryInstance):
     A class used to maintain a record of candidates assigned to particular areas.
 
     _entries: Key = area name (leverages dict implementation to ensure max one candidate per area)
-              Value = Candidate object (leverages CandidateRegistry singleton to persist votes across polling stations)
+              Value = Candidate object (shared through the election's CandidateRegistry to persist votes across stations)
+    area_registry: the AreaRegistry of the same election, used to check the candidate's area exists
 
     e.g.
     party = PoliticalParty("PP1")
@@ -71,6 +92,7 @@ class CandidateRegistryInstance(BaseRegistryInstance):
     """
 
     _entries: Dict[str, Candidate] = field(default_factory=dict)
+    area_registry: Optional[AreaRegistry] = field(default=None, repr=False, compare=False)
 
     @property
     def entries(self) -> dict:
@@ -91,26 +113,72 @@ class CandidateRegistryInstance(BaseRegistryInstance):
             raise ValueError(
                 f"cannot add candidate as there is already a candidate registered {self.entries.get(candidate.area)}"
             )
-        if not AreaRegistry.is_registry(level_area_mapping.get(candidate.level).__name__, candidate.area):
+        if not self.area_registry.is_registry(level_area_name_mapping[candidate.level], candidate.area):
             raise KeyError(f"No area instance exists for area {candidate.area}, create this please")
         self.entries[candidate.area] = candidate
+        self.area_registry.candidates_changed()
+
+    def validate_entries(self, candidates: List[Candidate]) -> List[str]:
+        """
+        Checks a batch of candidates in one pass, returning a message for every candidate add_entry would reject
+        (or that clashes with another candidate of the batch) rather than stopping at the first.
+        """
+        return validate_candidates(self.area_registry, self.entries, candidates)
+
+    def add_entries(self, candidates: List[Candidate]):
+        """
+        Adds a batch of candidates atomically: either every candidate is added or none is.
+
+        raises
+            CandidateRegistrationError: with every reason the batch cannot be added
+        """
+        errors = self.validate_entries(candidates)
+        if errors:
+            raise CandidateRegistrationError(errors)
+        self.entries.update((candidate.area, candidate) for candidate in candidates)
+        self.area_registry.candidates_changed()
+
+
+def validate_candidates(
+    area_registry: AreaRegistry, entries: Dict[str, Candidate], candidates: List[Candidate]
+) -> List[str]:
+    """
+    The set based equivalent of CandidateRegistryInstance.add_entry's checks for a batch of candidates of one
+    political party: unknown areas are found with one set difference per level and duplicates (within the batch or
+    against the already registered entries) with a set of the areas seen so far.
+    """
+    errors = []
+    areas_by_level: Dict[Any, set] = {}
+    for candidate in candidates:
+        areas_by_level.setdefault(candidate.level, set()).add(candidate.area)
+    unknown_areas = set()
+    for level, areas in areas_by_level.items():
+        unknown_areas |= areas - set(area_registry.get_for_area(level_area_name_mapping[level]))
+
+    seen = set(entries)
+    for candidate in candidates:
+        if candidate.area in unknown_areas:
+            errors.append(f"No area instance exists for area {candidate.area} ({candidate.name})")
+        elif candidate.area in seen:
+            errors.append(f"there is already a candidate registered for {candidate.area} ({candidate.name})")
+        seen.add(candidate.area)
+    return errors
 
 
 class BaseRegistry:
-    @staticmethod
     @abstractmethod
-    def get_or_create_registry_instance(*args, **kwargs) -> BaseRegistryInstance:
+    def get_or_create_registry_instance(self, *args, **kwargs) -> BaseRegistryInstance:
         ...
 
-    @staticmethod
     @abstractmethod
-    def get_for_area(area_instance_name) -> Any:
+    def get_for_area(self, area_instance_name) -> Any:
         ...
 
 
 class AreaRegistry(BaseRegistry):
     """
-    A singleton factory method that persists AreaRegistryInstances (used to keep track of graph dependencies)
+    A factory that persists the AreaRegistryInstances of one election (used to keep track of graph dependencies),
+    owned by an Election (see election.Election.area_registry)
 
     _instances:
         dict where key is AreaClass.__name__ e.g.:
@@ -119,21 +187,92 @@ class AreaRegistry(BaseRegistry):
                 dict where key = AreaClass(name="AA1").name e.g.:
                     'AA0', 'AA1', 'AA2', 'AA3', 'AA4'
 
+    _topology:
+        an AreaTopology mirroring _instances with integer ids, kept in sync by HierarchicalAreaNode.add_child.
+        Built on first use so that processes which never query it do not pay for importing numpy.
+
+    _stations:
+        a flat (lga name, polling station name) -> PollingStation locator index, built on first use and dropped
+        whenever an area is linked.
+
+    _ballots:
+        the Ballot handed out per (lga name, polling station name) by get_ballot, reused for every voter of the
+        station and dropped whenever an area is linked or a candidate registered.
+
+    _candidate_maps:
+        the CandidateLevel -> {party: Candidate} map per (lga name, polling station name) used to dispatch votes
+        (see PollingStation.candidate_level_map), dropped together with _ballots.
+
     """
 
-    _instances: Dict[str, Dict[str, AreaRegistryInstance]] = {}
+    def __init__(self):
+        self._instances: Dict[str, Dict[str, AreaRegistryInstance]] = {}
+        self._topology: Optional[AreaTopology] = None
+        self._stations: Optional[Dict[Tuple[str, str], PollingStation]] = None
+        self._ballots: Dict[Tuple[str, str], Ballot] = {}
+        self._candidate_maps: Dict[Tuple[str, str], dict] = {}
+        # bumped whenever an area is created or linked or a candidate registered, lets readers of the tallies tell
+        # whether the shape of the election changed (tally_version only follows votes)
+        self.structure_version = 0
+
+    def get_or_create_registry_instance(self, registry_name, area) -> AreaRegistryInstance:
+        if area not in self._instances:
+            self._instances[area] = {}
+        if registry_name not in self._instances[area]:
+            self._instances[area][registry_name] = AreaRegistryInstance()
+            self.structure_version += 1
+            if self._topology is not None:
+                self._topology.add_area(area, registry_name)
+
+        return self._instances[area][registry_name]
+
+    def link(self, parent: AbstractArea, child: AbstractArea):
+        """records a parent -> child edge in the area topology (if built, otherwise it is read from the registry)"""
+        if self._topology is not None:
+            self._topology.link(parent.__class__.__name__, parent.name, child.__class__.__name__, child.name)
+        self._stations = None
+        self._ballots = {}
+        self._candidate_maps = {}
+        self.structure_version += 1
+
+    def candidates_changed(self):
+        """drops the ballots and candidate maps handed out, called whenever a candidate is registered"""
+        self._ballots = {}
+        self._candidate_maps = {}
+        self.structure_version += 1
+
+    def candidate_level_map(self, station: PollingStation) -> dict:
+        """
+        the CandidateLevel -> {party: Candidate} map of a linked polling station, built once (walking the parent
+        chain for every level) and reused for every voter until the areas or candidates change
+        """
+        key = (station.parent.name, station.name)
+        # a map built while the cache is dropped goes into the dropped dict, never into its replacement
+        candidate_maps = self._candidate_maps
+        candidate_level_map = candidate_maps.get(key)
+        if candidate_level_map is None:
+            candidate_level_map = candidate_maps[key] = station.candidates.candidate_level_map
+        return candidate_level_map
+
+    def topology(self) -> AreaTopology:
+        """
+        the integer indexed view of the area graph used for vectorised ancestor/subtree queries e.g.
+        topology = election.area_registry.topology()
+        aa1 = topology.id_of("AdministrativeArea", "AA1")
+        topology.descendants("AdministrativeArea", aa1)  # ids of every polling station under AA1
+        """
+        if self._topology is None:
+            return self.rebuild_topology()
+        return self._topology
 
-    @staticmethod
-    def get_or_create_registry_instance(registry_name, area) -> AreaRegistryInstance:
-        if area not in AreaRegistry._instances:
-            AreaRegistry._instances[area] = {}
-        if registry_name not in AreaRegistry._instances[area]:
-            AreaRegistry._instances[area][registry_name] = AreaRegistryInstance()
+    def rebuild_topology(self) -> AreaTopology:
+        """rebuilds the area topology from the registry instances"""
+        from topology import AreaTopology
 
-        return AreaRegistry._instances[area][registry_name]
+        self._topology = AreaTopology.from_registry(self._instances)
+        return self._topology
 
-    @staticmethod
-    def get_for_area(area_class_name) -> Optional[List[str]]:
+    def get_for_area(self, area_class_name) -> Optional[List[str]]:
         """
         a method used for getting the instance names for a given AreaClass.__name__
         Parameters
@@ -141,30 +280,88 @@ class AreaRegistry(BaseRegistry):
         Returns
             A list of area instance names e.g. ["Gwugwuru"]
         """
-        return list(AreaRegistry._instances.get(area_class_name).keys())
+        return list(self._instances.get(area_class_name, {}).keys())
 
-    @staticmethod
-    def is_registry(area, registry_name):
-        return bool(AreaRegistry._instances.get(area, {}).get(registry_name))
+    def is_registry(self, area, registry_name):
+        return bool(self._instances.get(area, {}).get(registry_name))
+
+    def get_polling_station(self, lga: str, polling_station: str) -> Optional[PollingStation]:
+        """
+        looks up a polling station with a single hash lookup in the locator index, without creating any registry
+        instance, None if it does not exist
+        """
+        stations = self._stations
+        if stations is None:
+            stations = {(lga_name, station.name): station for lga_name, station in self.polling_stations()}
+            self._stations = stations
+        return stations.get((lga, polling_station))
+
+    def get_ballot(self, lga: str, polling_station: str) -> Optional[Ballot]:
+        """
+        the Ballot of a polling station, built once and reused for every voter until the areas or candidates change,
+        None if the polling station does not exist
+        """
+        key = (lga, polling_station)
+        ballot = self._ballots.get(key)
+        if ballot is None:
+            station = self.get_polling_station(lga, polling_station)
+            if station is None:
+                return None
+            ballot = self._ballots[key] = station.get_ballot()
+        return ballot
+
+    def areas(self) -> Iterator[Tuple[str, str]]:
+        """yields (AreaClass.__name__, area name) for every hierarchical area (polling stations are not registries)"""
+        for area_class_name, registry_instances in self._instances.items():
+            for area_name in registry_instances:
+                yield area_class_name, area_name
+
+    def links(self) -> Iterator[Tuple[str, str, str, str]]:
+        """yields (parent class name, parent name, child class name, child name) for every parent -> child edge"""
+        for area_class_name, registry_instances in self._instances.items():
+            for area_name, registry_instance in registry_instances.items():
+                for child in registry_instance.entries.values():
+                    yield area_class_name, area_name, child.__class__.__name__, child.name
+
+    def polling_stations(self) -> Iterator[Tuple[str, PollingStation]]:
+        """yields (lga name, polling station) for every polling station added to a local government area"""
+        for lga, registry_instance in self._instances.get("LocalGovernmentArea", {}).items():
+            for polling_station in registry_instance.entries.values():
+                yield lga, polling_station
 
 
 class CandidateRegistry(BaseRegistry):
     """
-    A singleton factory method that persists CandidateRegistryInstances
+    A factory that persists the CandidateRegistryInstances (one per political party) of one election, owned by an
+    Election (see election.Election.candidate_registry)
+
+    Parameters:
+        area_registry (AreaRegistry): the area registry of the same election that candidate areas are checked against
     """
 
-    _instances: Dict[str, CandidateRegistryInstance] = {}
+    def __init__(self, area_registry: AreaRegistry):
+        self.area_registry = area_registry
+        self._instances: Dict[str, CandidateRegistryInstance] = {}
+
+    def get_or_create_registry_instance(self, party) -> CandidateRegistryInstance:
+        if party not in self._instances:
+            self._instances[party] = CandidateRegistryInstance(area_registry=self.area_registry)
+        return self._instances[party]
+
+    def validate_entries(self, party: str, candidates: List[Candidate]) -> List[str]:
+        """CandidateRegistryInstance.validate_entries for party, without creating its registry instance"""
+        registry_instance = self._instances.get(party)
+        entries = registry_instance.entries if registry_instance is not None else {}
+        return validate_candidates(self.area_registry, entries, candidates)
 
-    @staticmethod
-    def get_or_create_registry_instance(party) -> CandidateRegistryInstance:
-        if party not in CandidateRegistry._instances:
-            CandidateRegistry._instances[party] = CandidateRegistryInstance()
-        return CandidateRegistry._instances[party]
+    def candidates(self) -> Iterator[Candidate]:
+        """yields every registered candidate of every political party"""
+        for registry_instance in self._instances.values():
+            yield from registry_instance.entries.values()
 
-    @staticmethod
-    def get_for_area(area_instance_name) -> Dict[str, Candidate]:
+    def get_for_area(self, area_instance_name) -> Dict[str, Candidate]:
         """
-        A static method used to retrieve the candidates assigned to an area instance
+        A method used to retrieve the candidates assigned to an area instance
 
         Process:
         1. iterates through each political party
@@ -175,7 +372,7 @@ class CandidateRegistry(BaseRegistry):
             area_instance_name: e.g. AA1
         """
         candidates = {}
-        for party, area_map in CandidateRegistry._instances.items():
+        for party, area_map in self._instances.items():
             candidate = area_map.entries.get(area_instance_name)
             if not candidate:
                 continue
@@ -0,0 +1,117 @@
+import enum
+import threading
+from collections import Counter, deque
+from itertools import islice
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from candidate_level import CandidateLevel
+
+
+@enum.unique
+class RejectCode(enum.IntEnum):
+    """The reasons a vote can be rejected by the bulk voting path"""
+
+    AUTHENTICATION_FAILED = 1
+    WRONG_POLLING_STATION = 2
+    ALREADY_VOTED = 3
+    NOT_ON_BALLOT = 4
+    UNKNOWN_LEVEL = 5
+    UNKNOWN_POLLING_STATION = 6
+
+
+class RejectRecord(NamedTuple):
+    """
+    A compact record of one rejected voter.
+
+    Parameters:
+        lga (str): the local government area of the polling station that rejected the vote
+        polling_station (str): the polling station that rejected the vote
+        voter_id (int): Voter.voter_id of the rejected voter
+        code (RejectCode): why the vote was rejected
+        level (CandidateLevel): the level that failed validation, None for voter level failures
+    """
+
+    lga: str
+    polling_station: str
+    voter_id: int
+    code: RejectCode
+    level: Optional[CandidateLevel] = None
+
+
+class BulkVoteResult(NamedTuple):
+    """the outcome of PollingStation.vote_many: how many voters were counted and a record per rejected voter"""
+
+    accepted: int
+    rejected: List[RejectRecord]
+
+
+class RejectLog:
+    """
+    Aggregates the reject records of an election per (lga, polling station, reason) and keeps the most recent
+    max_records records to page through afterwards.
+
+    Parameters:
+        max_records (int): the number of individual records kept, older records are dropped (but stay counted)
+
+    Example:
+        >>> log = RejectLog()
+        >>> log.extend([RejectRecord("LGA1", "PS1", 7, RejectCode.ALREADY_VOTED)])
+        >>> log.counts()
+        {('LGA1', 'PS1', <RejectCode.ALREADY_VOTED: 3>): 1}
+        >>> log.page(limit=10)
+        [RejectRecord(lga='LGA1', polling_station='PS1', voter_id=7, code=<RejectCode.ALREADY_VOTED: 3>, level=None)]
+    """
+
+    def __init__(self, max_records: int = 1_000_000):
+        self.max_records = max_records
+        self._counts: Counter = Counter()
+        self._records: deque = deque(maxlen=max_records)
+        self._dropped = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """the total number of rejects seen, including dropped records"""
+        return sum(self._counts.values())
+
+    @property
+    def dropped(self) -> int:
+        """the number of records no longer held because max_records was exceeded"""
+        return self._dropped
+
+    def extend(self, records: Iterable[RejectRecord]):
+        with self._lock:
+            for record in records:
+                if len(self._records) == self.max_records:
+                    self._dropped += 1
+                self._records.append(record)
+                self._counts[(record.lga, record.polling_station, record.code)] += 1
+
+    def counts(
+        self, lga: Optional[str] = None, polling_station: Optional[str] = None
+    ) -> Dict[Tuple[str, str, RejectCode], int]:
+        """the number of rejects per (lga, polling station, reason), optionally for one lga or polling station"""
+        with self._lock:
+            return {
+                key: count
+                for key, count in self._counts.items()
+                if (lga is None or key[0] == lga) and (polling_station is None or key[1] == polling_station)
+            }
+
+    def page(
+        self,
+        offset: int = 0,
+        limit: int = 100,
+        lga: Optional[str] = None,
+        polling_station: Optional[str] = None,
+        code: Optional[RejectCode] = None,
+    ) -> List[RejectRecord]:
+        """returns up to limit held records (oldest first) after skipping offset matching records"""
+        with self._lock:
+            matching = (
+                record
+                for record in self._records
+                if (lga is None or record.lga == lga)
+                and (polling_station is None or record.polling_station == polling_station)
+                and (code is None or record.code == code)
+            )
+            return list(islice(matching, offset, offset + limit))
@@ -0,0 +1,466 @@
+import multiprocessing
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from itertools import islice
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Dict, List, Optional, Tuple
+
+from areas import AdministrativeArea, Constituency, CountryArea, LocalGovernmentArea, PollingStation
+from candidate_level import CandidateLevel
+from election import Election, resolve_election
+from pco import PCO
+from political_party import Candidate, PoliticalParty
+from voter import Voter, reserve_voter_ids
+
+AREA_CLASSES = {
+    area_class.__name__: area_class
+    for area_class in (CountryArea, AdministrativeArea, Constituency, LocalGovernmentArea, PollingStation)
+}
+
+# record kinds
+AREA = "area"
+LINK = "link"
+CANDIDATE = "candidate"
+VOTE = "vote"
+
+
+class ReplicationDivergedError(Exception):
+    """a record or checkpoint could not be applied to the standby election, which no longer matches the primary"""
+
+
+@dataclass(frozen=True)
+class ReplicationRecord:
+    """
+    One committed change on the primary, numbered without gaps from 1.
+
+    payload per kind:
+        area: (AreaClass.__name__, name)
+        link: (parent class name, parent name, child class name, child name)
+        candidate: (party, CandidateLevel.name, area, candidate name)
+        vote: (lga, polling station, voter_id, {CandidateLevel.name: party})
+    """
+
+    seq: int
+    committed_at: float
+    kind: str
+    payload: tuple
+
+
+@dataclass(frozen=True)
+class Checkpoint:
+    """
+    The full state of the primary as of record seq, sent to a follower that is new or too far behind to catch up
+    from the retained records.
+
+    Parameters:
+        seq (int): the last record the checkpoint includes
+        areas (List[Tuple[str, str]]): see AreaRegistry.areas
+        links (List[Tuple[str, str, str, str]]): see AreaRegistry.links
+        candidates (List[Tuple[str, str, str, str, int]]): (party, level name, area, name, votes)
+        stations (Dict[Tuple[str, str], Tuple[dict, dict]]): (lga, polling station) -> (tallies, already voted ids),
+            both keyed by level name
+    """
+
+    seq: int
+    committed_at: float
+    areas: List[Tuple[str, str]]
+    links: List[Tuple[str, str, str, str]]
+    candidates: List[Tuple[str, str, str, str, int]]
+    stations: Dict[Tuple[str, str], Tuple[dict, dict]]
+
+
+@dataclass(frozen=True)
+class ReplicationLag:
+    """
+    How far a follower is behind its primary.
+
+    Parameters:
+        records (int): records committed on the primary (as of its last heartbeat) but not applied yet
+        seconds (float): the age of the last applied record while records are outstanding, 0 when caught up
+        connected (bool): whether the follower is currently connected to the primary
+        skipped (int): records that could not be applied, each one makes the follower resync from a checkpoint
+        failure (str): why the last record or checkpoint could not be applied, None if every one so far was applied
+    """
+
+    records: int
+    seconds: float
+    connected: bool
+    skipped: int = 0
+    failure: Optional[str] = None
+
+
+class ReplicationLog:
+    """
+    The ordered log of committed changes of a primary election: votes, area creation and links, and candidate
+    registrations. Attach it before ingestion starts (election.replication = ReplicationLog(election)), every change
+    is appended under the tally lock together with the change itself, so the log holds them in commit order and a
+    vote never comes before the area, link or candidate it needs. The most recent max_records records are
+    retained for followers catching up after a disconnect, a follower further behind is sent a checkpoint first.
+
+    Votes added in bulk straight to the tallies (ElectionSimulator.apply, DeltaMerger.merge) are not votes of
+    identified voters and are only carried over to followers by checkpoints.
+
+    Parameters:
+        election (Election): the primary election, defaults to the current election
+        max_records (int): the number of records retained
+    """
+
+    def __init__(self, election: Optional[Election] = None, max_records: int = 1_000_000):
+        self.election = resolve_election(election)
+        self.max_records = max_records
+        self._records: deque = deque(maxlen=max_records)
+        self._seq = 0
+        self._condition = threading.Condition()
+
+    @property
+    def seq(self) -> int:
+        """the last committed record"""
+        return self._seq
+
+    def append(self, kind: str, payload: tuple) -> int:
+        with self._condition:
+            self._seq += 1
+            self._records.append(ReplicationRecord(self._seq, time.time(), kind, payload))
+            self._condition.notify_all()
+            return self._seq
+
+    def area_created(self, area_class_name: str, name: str):
+        self.append(AREA, (area_class_name, name))
+
+    def area_linked(self, parent_class_name: str, parent_name: str, child_class_name: str, child_name: str):
+        self.append(LINK, (parent_class_name, parent_name, child_class_name, child_name))
+
+    def candidates_registered(self, candidates: List[Candidate]):
+        for candidate in candidates:
+            self.append(CANDIDATE, (candidate.party, candidate.level.name, candidate.area, candidate.name))
+
+    def vote(self, lga: str, polling_station: str, voter_id: int, votes: Dict[CandidateLevel, str]):
+        """appends one committed voter (called under the election's tally lock)"""
+        self.append(VOTE, (lga, polling_station, voter_id, {level.name: party for level, party in votes.items()}))
+
+    def records_after(self, seq: int, timeout: Optional[float] = None) -> Optional[List[ReplicationRecord]]:
+        """
+        the retained records after seq, waiting up to timeout seconds for one if there are none yet. None if records
+        after seq are no longer retained (or seq is ahead of this log), the caller then needs a checkpoint.
+        """
+        with self._condition:
+            if timeout and seq == self._seq:
+                self._condition.wait(timeout)
+            first = self._records[0].seq if self._records else self._seq + 1
+            if seq > self._seq or seq < first - 1:
+                return None
+            return list(islice(self._records, seq - first + 1, None))
+
+    def checkpoint(self) -> Checkpoint:
+        """copies the state of the election and the seq it corresponds to, without letting any vote commit meanwhile"""
+        election = self.election
+        with election.tally_lock, self._condition:
+            stations = {
+                (lga, polling_station.name): (
+                    {level.name: dict(tally) for level, tally in polling_station.tallies.items()},
+                    {level.name: list(voter_ids) for level, voter_ids in polling_station.already_voted.items()},
+                )
+                for lga, polling_station in election.area_registry.polling_stations()
+            }
+            candidates = [
+                (candidate.party, candidate.level.name, candidate.area, candidate.name, candidate.votes)
+                for candidate in election.candidate_registry.candidates()
+            ]
+            return Checkpoint(
+                seq=self._seq,
+                committed_at=time.time(),
+                areas=list(election.area_registry.areas()),
+                links=list(election.area_registry.links()),
+                candidates=candidates,
+                stations=stations,
+            )
+
+
+class ReplicationServer:
+    """
+    Streams a ReplicationLog to followers connecting over a local socket (a multiprocessing.connection Listener).
+    A follower opens with the last record it applied and is sent the retained records after it, or a checkpoint
+    followed by the records after the checkpoint, then every new record as it is committed. A heartbeat with the
+    primary's last seq follows every batch of records (and every heartbeat seconds when idle) for lag reporting.
+
+    Parameters:
+        log (ReplicationLog): the log to stream
+        address: a unix socket path or (host, port), defaults to a free port on localhost
+        authkey (bytes): shared with the followers, defaults to multiprocessing.current_process().authkey (which
+            child processes inherit). Connections are always authenticated before anything is unpickled.
+        heartbeat (float): seconds between heartbeats when idle
+
+    Example:
+        >>> election.replication = ReplicationLog(election)
+        >>> server = ReplicationServer(election.replication, authkey=b"secret")
+        >>> server.start()
+        >>> standby = ReplicationFollower(server.address, authkey=b"secret")
+    """
+
+    def __init__(
+        self,
+        log: ReplicationLog,
+        address: Any = ("localhost", 0),
+        authkey: Optional[bytes] = None,
+        heartbeat: float = 0.5,
+    ):
+        self.log = log
+        self.heartbeat = heartbeat
+        self.authkey = authkey if authkey is not None else multiprocessing.current_process().authkey
+        self._listener = Listener(address, authkey=self.authkey)
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def address(self):
+        return self._listener.address
+
+    def start(self):
+        thread = threading.Thread(target=self._accept, name="replication-accept", daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        # wake the blocking accept with a connection of our own
+        try:
+            Client(self.address, authkey=self.authkey).close()
+        except OSError:
+            pass
+        for thread in self._threads:
+            thread.join()
+        self._listener.close()
+
+    def _accept(self):
+        while not self._stopping.is_set():
+            try:
+                connection = self._listener.accept()
+            except (OSError, EOFError, multiprocessing.AuthenticationError):
+                # a client that went away or failed the handshake
+                continue
+            if self._stopping.is_set():
+                connection.close()
+                return
+            thread = threading.Thread(target=self._serve, args=(connection,), name="replication-stream", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _serve(self, connection: Connection):
+        with connection:
+            try:
+                _, applied = connection.recv()
+                records = self.log.records_after(applied) if applied else None
+                while not self._stopping.is_set():
+                    if records is None:
+                        checkpoint = self.log.checkpoint()
+                        connection.send(("checkpoint", checkpoint))
+                        applied = checkpoint.seq
+                    else:
+                        for record in records:
+                            connection.send(("record", record))
+                            applied = record.seq
+                        connection.send(("heartbeat", self.log.seq))
+                    records = self.log.records_after(applied, timeout=self.heartbeat)
+            except (EOFError, OSError):
+                return
+
+
+class ReplicationFollower:
+    """
+    A hot standby: applies the changes streamed by a ReplicationServer to its own election so that it can take over
+    at once (see promote). The follower reconnects after a disconnect and catches up from the retained records, or
+    from a checkpoint (which replaces its election) if it fell too far behind. A record that cannot be applied
+    means the standby diverged from the primary: it is counted in lag().skipped with the reason in lag().failure,
+    and the follower reconnects asking for a fresh checkpoint rather than carrying on with a wrong election.
+
+    Parameters:
+        address: the address of the ReplicationServer
+        authkey (bytes): the authkey of the ReplicationServer, defaults to multiprocessing.current_process().authkey
+        name (str): the name of the standby election
+        retry_interval (float): seconds between reconnection attempts
+    """
+
+    def __init__(
+        self, address: Any, authkey: Optional[bytes] = None, name: str = "standby", retry_interval: float = 0.5
+    ):
+        self.address = address
+        self.authkey = authkey if authkey is not None else multiprocessing.current_process().authkey
+        self.name = name
+        self.retry_interval = retry_interval
+        self.election = Election(name)
+        self.skipped = 0
+        self.failure: Optional[str] = None
+        self._needs_checkpoint = False
+        self._areas: Dict[Tuple[str, str], Any] = {}
+        self._applied_seq = 0
+        self._applied_at = 0.0
+        self._primary_seq = 0
+        self._max_voter_id = -1
+        self._connected = False
+        self._condition = threading.Condition()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def applied_seq(self) -> int:
+        return self._applied_seq
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="replication-follower", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def lag(self) -> ReplicationLag:
+        with self._condition:
+            records = max(self._primary_seq - self._applied_seq, 0)
+            seconds = time.time() - self._applied_at if records and self._applied_at else 0.0
+            return ReplicationLag(
+                records=records,
+                seconds=seconds,
+                connected=self._connected,
+                skipped=self.skipped,
+                failure=self.failure,
+            )
+
+    def wait_for(self, seq: int, timeout: Optional[float] = None) -> bool:
+        """waits until record seq has been applied, returns False on timeout"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._applied_seq >= seq, timeout)
+
+    def promote(self) -> Election:
+        """stops following and returns the standby election, ready to take over ingestion"""
+        self.stop()
+        reserve_voter_ids(self._max_voter_id + 1)
+        return self.election
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                with Client(self.address, authkey=self.authkey) as connection:
+                    # a hello for seq 0 is answered with a checkpoint
+                    connection.send(("hello", 0 if self._needs_checkpoint else self._applied_seq))
+                    self._connected = True
+                    while not self._stopping.is_set():
+                        if connection.poll(self.retry_interval):
+                            self._handle(*connection.recv())
+            except (EOFError, OSError, multiprocessing.AuthenticationError, ReplicationDivergedError):
+                pass
+            finally:
+                self._connected = False
+            self._stopping.wait(self.retry_interval)
+
+    def _handle(self, kind: str, message):
+        if kind == "heartbeat":
+            with self._condition:
+                self._primary_seq = max(self._primary_seq, message)
+            return
+        try:
+            if kind == "checkpoint":
+                self._apply_checkpoint(message)
+            else:
+                self._apply(message)
+        except Exception as error:
+            with self._condition:
+                self.skipped += 1
+                self.failure = f"{kind} {message.seq}: {error!r}"
+            self._needs_checkpoint = True
+            raise ReplicationDivergedError(self.failure) from error
+        if kind == "checkpoint":
+            self._needs_checkpoint = False
+        with self._condition:
+            self._applied_seq = message.seq
+            self._applied_at = message.committed_at
+            self._primary_seq = max(self._primary_seq, message.seq)
+            self._condition.notify_all()
+
+    def _area(self, election: Election, area_class_name: str, name: str, lga: Optional[str] = None):
+        """
+        the follower's area object, created on first use. Polling station names are only unique within their lga,
+        so polling stations are keyed by (lga, name) like the topology does.
+        """
+        key = (area_class_name, lga, name)
+        area = self._areas.get(key)
+        if area is None:
+            area_class = AREA_CLASSES[area_class_name]
+            if area_class is PollingStation:
+                area = PollingStation(name=name, pco=PCO(), election=election)
+            else:
+                area = area_class(name, election=election)
+            self._areas[key] = area
+        return area
+
+    def _link(
+        self, election: Election, parent_class_name: str, parent_name: str, child_class_name: str, child_name: str
+    ):
+        parent = self._area(election, parent_class_name, parent_name)
+        lga = parent_name if child_class_name == PollingStation.__name__ else None
+        child = self._area(election, child_class_name, child_name, lga)
+        if child.name not in parent.area_registry_instance.entries:
+            parent.add_child(child)
+
+    def _apply(self, record: ReplicationRecord):
+        """applies one record, records already contained in the checkpoint the follower started from are no-ops"""
+        election = self.election
+        if record.kind == AREA:
+            self._area(election, *record.payload)
+        elif record.kind == LINK:
+            self._link(election, *record.payload)
+        elif record.kind == CANDIDATE:
+            party, level_name, area, name = record.payload
+            if party not in election.candidate_registry.get_for_area(area):
+                PoliticalParty(party, election=election).register(
+                    Candidate(level=CandidateLevel[level_name], area=area, name=name)
+                )
+        elif record.kind == VOTE:
+            lga, name, voter_id, votes = record.payload
+            polling_station = election.area_registry.get_polling_station(lga, name)
+            if polling_station is None:
+                raise ReplicationDivergedError(f"vote for unknown polling station {lga}/{name}")
+            voter = Voter(polling_station_name=name, voter_name="", authentication_strategy=None)
+            voter.voter_id = voter_id
+            voter.votes = {CandidateLevel[level_name]: party for level_name, party in votes.items()}
+            polling_station.replay(voter)
+            self._max_voter_id = max(self._max_voter_id, voter_id)
+
+    def _apply_checkpoint(self, checkpoint: Checkpoint):
+        """rebuilds the standby election from a checkpoint, replacing the current one"""
+        election = Election(self.name)
+        self._areas = {}
+        for area_class_name, name in checkpoint.areas:
+            self._area(election, area_class_name, name)
+        for link in checkpoint.links:
+            self._link(election, *link)
+
+        candidates_per_party: Dict[str, List[Candidate]] = {}
+        votes = {}
+        for party, level_name, area, name, candidate_votes in checkpoint.candidates:
+            candidate = Candidate(level=CandidateLevel[level_name], area=area, name=name)
+            candidates_per_party.setdefault(party, []).append(candidate)
+            votes[id(candidate)] = candidate_votes
+        for party, candidates in candidates_per_party.items():
+            PoliticalParty(party, election=election).register_many(candidates)
+            for candidate in candidates:
+                candidate.votes = votes[id(candidate)]
+
+        for (lga, name), (tallies, already_voted) in checkpoint.stations.items():
+            polling_station = election.area_registry.get_polling_station(lga, name)
+            if polling_station is None:
+                raise ReplicationDivergedError(f"checkpoint tallies for unlinked polling station {lga}/{name}")
+            polling_station.tallies = {CandidateLevel[level]: dict(tally) for level, tally in tallies.items()}
+            polling_station.already_voted = {
+                CandidateLevel[level]: set(voter_ids) for level, voter_ids in already_voted.items()
+            }
+            for voter_ids in already_voted.values():
+                self._max_voter_id = max(self._max_voter_id, *voter_ids, -1)
+            election.tally_changed(lga, name)
+        self.election = election
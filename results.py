@@ -1,14 +1,45 @@
-from political_party import CandidateLevel
-from registries import AreaRegistry
-from utils import level_area_mapping
+from typing import List, Optional, Tuple
 
+from candidate_level import CandidateLevel
+from election import Election, resolve_election
+from utils import level_area_name_mapping
 
-def get_results(level: CandidateLevel):
+NO_RESULT = "NO_RESULT"
+HUNG_RESULT = "HUNG_RESULT"
+
+
+def get_winner(party_votes: dict) -> str:
+    """
+    Decides the result of a single area given its votes per party.
+
+    Returns:
+        NO_RESULT if no candidates are registered, HUNG_RESULT if the top vote count is shared, otherwise the
+        name of the winning party
+    """
+    return get_winner_and_leaders(party_votes)[0]
+
+
+def get_winner_and_leaders(party_votes: dict) -> Tuple[str, List[str]]:
+    """
+    get_winner, also returning the parties with the most votes (the tied parties of a HUNG_RESULT, empty for a
+    NO_RESULT)
+    """
+    if not party_votes:
+        return NO_RESULT, []
+    max_votes = max(party_votes.values())
+    parties_with_max_votes = [key for key, value in party_votes.items() if value == max_votes]
+    if len(parties_with_max_votes) == 1:
+        return parties_with_max_votes[0], parties_with_max_votes
+    return HUNG_RESULT, parties_with_max_votes
+
+
+def get_results(level: CandidateLevel, election: Optional[Election] = None):
     """
     Get election results for a specific CandidateLevel.
 
     Parameters:
         level (str): The CandidateLevel level for which election results are requested.
+        election (Election): The election to report on, defaults to the current election.
 
     Returns:
         dict: A dictionary containing election results for each eligible areia within the specified CandidateLevel.
@@ -25,24 +56,18 @@ def get_results(level: CandidateLevel):
     :param level:
     :return:
     """
-    area = level_area_mapping.get(level)
-    area_instance_names = AreaRegistry.get_for_area(area.__name__)
+    election = resolve_election(election)
+    area_instance_names = election.area_registry.get_for_area(level_area_name_mapping[level])
     area_results = {}
     for area_name in area_instance_names:
-        candidates = area(name=area_name).candidates
+        candidates = election.candidate_registry.get_for_area(area_name)
         results = {}
         for candidate_party, candidate in candidates.items():
             votes = candidate.votes
             results[candidate_party] = votes
-        if not results:
-            area_results[area_name] = "NO_RESULT"
-            continue
-        max_votes = max(results.values())
-        parties_with_max_votes = [key for key, value in results.items() if value == max_votes]
-        if len(parties_with_max_votes) == 1:
-            area_results[area_name] = parties_with_max_votes[0]
-        else:
+        winner, parties_with_max_votes = get_winner_and_leaders(results)
+        if winner == HUNG_RESULT:
             print(f"hung vote between following parties: {parties_with_max_votes}")
-            area_results[area_name] = "HUNG_RESULT"
+        area_results[area_name] = winner
 
     return area_results
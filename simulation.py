@@ -0,0 +1,190 @@
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from candidate_level import CandidateLevel
+from election import Election, resolve_election
+from results import HUNG_RESULT, NO_RESULT
+from topology import POLLING_STATION
+from utils import level_area_name_mapping, level_str_map
+
+# {CandidateLevel: {area name: {party: relative weight}}}, areas (or levels) left out vote uniformly
+Preferences = Dict[CandidateLevel, Dict[str, Dict[str, float]]]
+
+
+@dataclass(frozen=True)
+class AreaContest:
+    """
+    The contest for one area at one level: the parties on the ballot, the polling stations voting in it and the
+    probability of a voter choosing each party.
+    """
+
+    level: CandidateLevel
+    area: str
+    parties: Tuple[str, ...]
+    station_ids: np.ndarray
+    probabilities: np.ndarray
+
+
+@dataclass(frozen=True)
+class SimulatedVotes:
+    """
+    One simulated election, counts[i, j] being the votes for contest.parties[j] at polling station
+    contest.station_ids[i], for each contest.
+    """
+
+    contests: List[AreaContest]
+    counts: List[np.ndarray]
+
+
+class ElectionSimulator:
+    """
+    Generates votes from per area party preference distributions over the topology of an election, e.g.
+
+    simulator = ElectionSimulator(voters_per_station=10_000, seed=1)
+    simulator.apply(simulator.simulate())  # bulk load a simulated election into the tallies
+    simulator.win_probabilities(CandidateLevel.PRESIDENT, trials=10_000)
+    {'Gwugwuru': {'PP1': 0.49, 'PP2': 0.50, 'HUNG_RESULT': 0.01}}
+
+    Parameters:
+        election (Election): the election to simulate, defaults to the current election
+        preferences (Preferences): party weights per area, areas without preferences vote uniformly for the
+            candidates registered there
+        voters_per_station: the number of voters at each polling station, either one number for every station or
+            one per polling station id of the election topology
+        seed: seed of the numpy random generator
+    """
+
+    def __init__(
+        self,
+        election: Optional[Election] = None,
+        preferences: Optional[Preferences] = None,
+        voters_per_station: Union[int, np.ndarray] = 1000,
+        seed: Optional[int] = None,
+    ):
+        self.election = resolve_election(election)
+        self.preferences = preferences or {}
+        self.rng = np.random.default_rng(seed)
+        topology = self.election.topology
+        self.station_keys = topology.names(POLLING_STATION)
+        self.voters_per_station = np.broadcast_to(
+            np.asarray(voters_per_station, dtype=np.int64), (topology.size(POLLING_STATION),)
+        )
+        self.contests = self._contests()
+
+    def _contests(self) -> List[AreaContest]:
+        """resolves every area contest in one pass of the topology, vectorised per level"""
+        topology = self.election.topology
+        ancestors = topology.ancestors(POLLING_STATION)
+        contests = []
+        for level, area_class_name in level_area_name_mapping.items():
+            owners = ancestors[area_class_name]
+            for area_id, area_name in enumerate(topology.names(area_class_name)):
+                parties = tuple(self.election.candidate_registry.get_for_area(area_name))
+                if not parties:
+                    continue
+                weights = self.preferences.get(level, {}).get(area_name, {})
+                probabilities = np.array([weights.get(party, 0.0) if weights else 1.0 for party in parties])
+                if probabilities.sum() <= 0:
+                    raise ValueError(f"preferences for {area_name} do not give any weight to {parties}")
+                contests.append(
+                    AreaContest(
+                        level=level,
+                        area=area_name,
+                        parties=parties,
+                        station_ids=np.flatnonzero(owners == area_id),
+                        probabilities=probabilities / probabilities.sum(),
+                    )
+                )
+        return contests
+
+    def simulate(self) -> SimulatedVotes:
+        """draws the votes of every voter at every polling station, one multinomial draw per contest"""
+        counts = [
+            self.rng.multinomial(self.voters_per_station[contest.station_ids], contest.probabilities)
+            for contest in self.contests
+        ]
+        return SimulatedVotes(contests=self.contests, counts=counts)
+
+    def apply(self, votes: SimulatedVotes):
+        """
+        Adds simulated counts straight into the tallies of the election (candidate totals and polling station
+        tallies) under its tally lock, bypassing voter authentication and the double vote check as simulated voters
+        have no identity.
+        """
+        area_registry = self.election.area_registry
+        stations = [
+            area_registry.get_or_create_registry_instance(lga, "LocalGovernmentArea").entries[name]
+            for lga, name in self.station_keys
+        ]
+        with self.election.tally_lock:
+            for contest, counts in zip(votes.contests, votes.counts):
+                candidates = self.election.candidate_registry.get_for_area(contest.area)
+                for party, total in zip(contest.parties, counts.sum(axis=0).tolist()):
+                    candidates[party].votes += total
+                for station_id, station_counts in zip(contest.station_ids.tolist(), counts.tolist()):
+                    level_tally = stations[station_id].tallies.setdefault(contest.level, {})
+                    for party, votes_for_party in zip(contest.parties, station_counts):
+                        if votes_for_party:
+                            level_tally[party] = level_tally.get(party, 0) + votes_for_party
+            for lga, name in self.station_keys:
+                self.election.tally_changed(lga, name)
+
+    def packets(self, request_id_prefix: str = "sim") -> Iterator[dict]:
+        """
+        Yields one ClientAPI.json_request packet per simulated voter, so the simulation can drive the Server
+        ingestion path. Packets are generated one polling station at a time to keep memory flat.
+        """
+        station_contests: Dict[int, List[AreaContest]] = {}
+        for contest in self.contests:
+            for station_id in contest.station_ids.tolist():
+                station_contests.setdefault(station_id, []).append(contest)
+
+        for station_id, (lga, name) in enumerate(self.station_keys):
+            voters = int(self.voters_per_station[station_id])
+            choices = []
+            for contest in station_contests.get(station_id, []):
+                chosen = self.rng.choice(len(contest.parties), voters, p=contest.probabilities)
+                choices.append((level_str_map[contest.level], contest.parties, chosen))
+            for voter in range(voters):
+                yield {
+                    "voter_name": f"{request_id_prefix}-voter-{voter}",
+                    "ID": f"{voter % 1_000_000_000:09d}",
+                    "PC": name,
+                    "LGA": lga,
+                    "votes": {level: parties[chosen[voter]] for level, parties, chosen in choices},
+                    "request_id": f"{request_id_prefix}-{lga}-{name}-{voter}",
+                }
+
+    def win_probabilities(
+        self, level: CandidateLevel, trials: int = 1000, include_current: bool = False
+    ) -> Dict[str, Dict[str, float]]:
+        """
+        Runs trials simulated elections and returns, per area of level, the share of trials each outcome occurred,
+        using get_results semantics: the winning party, HUNG_RESULT for a shared top count and NO_RESULT for areas
+        without candidates.
+
+        Parameters:
+            level: the candidate level to project
+            trials: the number of simulated elections
+            include_current: add the votes already cast to every trial (a projection of the remaining votes)
+        """
+        area_class_name = level_area_name_mapping[level]
+        probabilities = {area_name: {NO_RESULT: 1.0} for area_name in self.election.topology.names(area_class_name)}
+        for contest in self.contests:
+            if contest.level is not level:
+                continue
+            voters = int(self.voters_per_station[contest.station_ids].sum())
+            counts = self.rng.multinomial(voters, contest.probabilities, size=trials)
+            if include_current:
+                candidates = self.election.candidate_registry.get_for_area(contest.area)
+                counts += np.array([candidates[party].votes for party in contest.parties])
+            top = counts.max(axis=1, keepdims=True)
+            hung = (counts == top).sum(axis=1) > 1
+            winners = np.bincount(counts.argmax(axis=1)[~hung], minlength=len(contest.parties))
+            outcome = {party: wins / trials for party, wins in zip(contest.parties, winners.tolist()) if wins}
+            if hung.any():
+                outcome[HUNG_RESULT] = float(hung.mean())
+            probabilities[contest.area] = outcome
+        return probabilities
@@ -0,0 +1,220 @@
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
+
+from candidate_level import CandidateLevel
+from election import Election, resolve_election
+from results import get_winner
+from utils import level_area_name_mapping
+
+# {CandidateLevel: {party: votes}}
+StationTally = Mapping[CandidateLevel, Mapping[str, int]]
+
+
+@dataclass(frozen=True)
+class TallyCopy:
+    """
+    The tallies copied by copy_tallies under the tally lock, plain dicts that are safe to read after the lock is
+    released.
+
+    Parameters:
+        tally_version (int): Election.tally_version as of the copy
+        structure_version (int): AreaRegistry.structure_version as of the copy
+        full (bool): every polling station and candidate was copied, otherwise only the changed ones
+        areas (Dict[CandidateLevel, Tuple[str, ...]]): the area names per level, only for a full copy
+        station_tallies (Dict[Tuple[str, str], Dict[CandidateLevel, Dict[str, int]]]): (lga, polling station) ->
+            level -> party -> votes
+        candidate_votes (Dict[Tuple[CandidateLevel, str, str], int]): (level, area, party) -> votes
+    """
+
+    tally_version: int
+    structure_version: int
+    full: bool
+    areas: Optional[Dict[CandidateLevel, Tuple[str, ...]]]
+    station_tallies: Dict[Tuple[str, str], Dict[CandidateLevel, Dict[str, int]]]
+    candidate_votes: Dict[Tuple[CandidateLevel, str, str], int]
+
+
+def copy_tallies(election: Optional[Election] = None, since: Optional[Tuple[int, int]] = None) -> TallyCopy:
+    """
+    Copies the tallies of election under its tally lock, the one place readers (SnapshotPublisher,
+    export.export_results) take their consistent copy from.
+
+    With since, the (tally_version, structure_version) of an earlier copy, only the polling stations changed after
+    it (see Election.station_changes) and the candidates on their ballots are copied, so ingestion is held up for
+    the changes rather than for every station. A full copy is taken without since or if areas or candidates were
+    added since.
+    """
+    election = resolve_election(election)
+    area_registry = election.area_registry
+    station_tallies = {}
+    candidate_votes = {}
+    with election.tally_lock:
+        tally_version = election.tally_version
+        structure_version = area_registry.structure_version
+        full = since is None or since[1] != structure_version
+        if full:
+            areas = {
+                level: tuple(area_registry.get_for_area(area_class_name))
+                for level, area_class_name in level_area_name_mapping.items()
+            }
+            for lga, polling_station in area_registry.polling_stations():
+                station_tallies[(lga, polling_station.name)] = {
+                    level: dict(tally) for level, tally in polling_station.tallies.items()
+                }
+            for candidate in election.candidate_registry.candidates():
+                candidate_votes[(candidate.level, candidate.area, candidate.party)] = candidate.votes
+        else:
+            areas = None
+            for key, changed_at in reversed(election.station_changes.items()):
+                if changed_at <= since[0]:
+                    break
+                polling_station = area_registry.get_polling_station(*key)
+                station_tallies[key] = {level: dict(tally) for level, tally in polling_station.tallies.items()}
+                for candidates in polling_station.candidate_level_map.values():
+                    for candidate in candidates.values():
+                        candidate_votes[(candidate.level, candidate.area, candidate.party)] = candidate.votes
+    return TallyCopy(
+        tally_version=tally_version,
+        structure_version=structure_version,
+        full=full,
+        areas=areas,
+        station_tallies=station_tallies,
+        candidate_votes=candidate_votes,
+    )
+
+
+@dataclass(frozen=True)
+class ResultsSnapshot:
+    """
+    An immutable, versioned copy of the tallies of an election, safe to read from any thread without a lock.
+
+    Parameters:
+        version (int): increases by one with every published snapshot
+        tally_version (int): Election.tally_version when the snapshot was taken
+        structure_version (int): AreaRegistry.structure_version when the snapshot was taken
+        created_at (float): time.monotonic() when the snapshot was taken (see age)
+        areas (Mapping[CandidateLevel, Tuple[str, ...]]): the area names per level
+        candidate_votes (Mapping[CandidateLevel, Mapping[str, Mapping[str, int]]]): level -> area -> party -> votes
+        station_tallies (Mapping[Tuple[str, str], StationTally]): (lga, polling station) -> level -> party -> votes
+    """
+
+    version: int
+    tally_version: int
+    structure_version: int
+    created_at: float
+    areas: Mapping[CandidateLevel, Tuple[str, ...]]
+    candidate_votes: Mapping[CandidateLevel, Mapping[str, Mapping[str, int]]]
+    station_tallies: Mapping[Tuple[str, str], StationTally]
+
+    def age(self) -> float:
+        """seconds since the snapshot was taken"""
+        return time.monotonic() - self.created_at
+
+    def results(self, level: CandidateLevel) -> Dict[str, str]:
+        """get_results for level as of this snapshot (without the HUNG_RESULT print)"""
+        votes = self.candidate_votes.get(level, {})
+        return {area_name: get_winner(votes.get(area_name, {})) for area_name in self.areas.get(level, ())}
+
+
+class SnapshotPublisher:
+    """
+    Publishes ResultsSnapshots of an election on demand (publish) or every interval seconds from a background
+    thread (start/stop). Readers call current() and never take a lock, the newest snapshot is swapped in with a
+    single reference assignment. Snapshots are copy-on-write: nothing is copied if no tally changed since the last
+    snapshot, ingestion is only held up while the stations changed since then are copied (see copy_tallies), and
+    the frozen tally of every polling station and area that did not change is shared with the previous snapshot.
+
+    Parameters:
+        election (Election): the election to publish, defaults to the current election
+        interval (float): seconds between snapshots when started
+
+    Example:
+        >>> publisher = SnapshotPublisher(election, interval=0.5)
+        >>> publisher.start()
+        >>> snapshot = publisher.current()
+        >>> snapshot.version, snapshot.age(), snapshot.results(CandidateLevel.PRESIDENT)
+        (12, 0.21, {'Gwugwuru': 'PP1'})
+    """
+
+    def __init__(self, election: Optional[Election] = None, interval: float = 1.0):
+        self.election = resolve_election(election)
+        self.interval = interval
+        self._snapshot: Optional[ResultsSnapshot] = None
+        self._publish_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def current(self) -> ResultsSnapshot:
+        """the newest snapshot, publishing the first one if none exists yet"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.publish()
+        return snapshot
+
+    def publish(self) -> ResultsSnapshot:
+        """takes and publishes a new snapshot (or returns the current one if no tally changed since)"""
+        with self._publish_lock:
+            previous = self._snapshot
+            election = self.election
+            since = (previous.tally_version, previous.structure_version) if previous is not None else None
+            if since is not None and since == (election.tally_version, election.area_registry.structure_version):
+                return previous
+            tallies = copy_tallies(election, since)
+
+            frozen = {
+                key: MappingProxyType({level: MappingProxyType(tally) for level, tally in station_tally.items()})
+                for key, station_tally in tallies.station_tallies.items()
+            }
+            changed_areas: Dict[CandidateLevel, Dict[str, Dict[str, int]]] = {}
+            for (level, area, party), votes in tallies.candidate_votes.items():
+                changed_areas.setdefault(level, {}).setdefault(area, {})[party] = votes
+            if tallies.full:
+                areas = MappingProxyType(tallies.areas)
+                station_tallies = frozen
+                candidate_votes = {level: {} for level in CandidateLevel}
+            else:
+                areas = previous.areas
+                station_tallies = {**previous.station_tallies, **frozen}
+                candidate_votes = {level: dict(area_votes) for level, area_votes in previous.candidate_votes.items()}
+            for level, area_votes in changed_areas.items():
+                for area, votes in area_votes.items():
+                    if not tallies.full:
+                        votes = {**candidate_votes[level].get(area, {}), **votes}
+                    candidate_votes[level][area] = MappingProxyType(votes)
+
+            snapshot = ResultsSnapshot(
+                version=previous.version + 1 if previous is not None else 1,
+                tally_version=tallies.tally_version,
+                structure_version=tallies.structure_version,
+                created_at=time.monotonic(),
+                areas=areas,
+                candidate_votes=MappingProxyType(
+                    {level: MappingProxyType(area_votes) for level, area_votes in candidate_votes.items()}
+                ),
+                station_tallies=MappingProxyType(station_tallies),
+            )
+            self._snapshot = snapshot
+            return snapshot
+
+    def start(self):
+        """publishes a snapshot every interval seconds from a daemon thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="results-snapshots", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.publish()
+            self._stop.wait(self.interval)
@@ -0,0 +1,179 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from authentication import AuthenticationError
+from candidate_level import CandidateLevel
+from election import Election, resolve_election
+
+# (lga, polling station, CandidateLevel.name, party) -> votes
+CountKey = Tuple[str, str, str, str]
+# (lga, polling station, CandidateLevel.name) -> distinct voters
+VotedKey = Tuple[str, str, str]
+
+
+@dataclass(frozen=True)
+class TallyDelta:
+    """
+    The tally state of one ingest node in G-counter form: every counter only ever grows on the node that owns it,
+    so merging is a per key max. Merging is therefore commutative (any order), idempotent (a delta can be merged any
+    number of times) and an older delta never undoes a newer one.
+
+    Parameters:
+        node_id (str): the ingest node that owns these counters
+        counts (Dict[CountKey, int]): the votes the node counted per polling station and party
+        voted (Dict[VotedKey, int]): the number of distinct voters the node counted per polling station and level
+            (a summary of PollingStation.already_voted, voter ids are only meaningful inside one process)
+    """
+
+    node_id: str
+    counts: Dict[CountKey, int] = field(default_factory=dict)
+    voted: Dict[VotedKey, int] = field(default_factory=dict)
+
+    @classmethod
+    def export(cls, node_id: str, election: Optional[Election] = None) -> "TallyDelta":
+        """reads the polling station tallies of election under its tally lock"""
+        election = resolve_election(election)
+        counts = {}
+        voted = {}
+        with election.tally_lock:
+            for lga, polling_station in election.area_registry.polling_stations():
+                for level, party_tally in polling_station.tallies.items():
+                    for party, votes in party_tally.items():
+                        counts[(lga, polling_station.name, level.name, party)] = votes
+                for level, voter_ids in polling_station.already_voted.items():
+                    voted[(lga, polling_station.name, level.name)] = len(voter_ids)
+        return cls(node_id=node_id, counts=counts, voted=voted)
+
+    def to_dict(self) -> dict:
+        """a compact JSON serialisable form"""
+        return {
+            "node_id": self.node_id,
+            "counts": [[*key, votes] for key, votes in self.counts.items()],
+            "voted": [[*key, voters] for key, voters in self.voted.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TallyDelta":
+        return cls(
+            node_id=data["node_id"],
+            counts={tuple(row[:4]): row[4] for row in data["counts"]},
+            voted={tuple(row[:3]): row[3] for row in data["voted"]},
+        )
+
+
+class DeltaMerger:
+    """
+    Merges TallyDeltas from ingest nodes into a coordinator election, which must hold the same areas and
+    candidates. The coordinator election remembers the highest counter merged per node and key (see
+    Election.delta_counts), and only the growth beyond it is added to its candidate votes and polling station
+    tallies, so get_results on the coordinator reflects every node without any vote packets being shipped. Any
+    number of mergers of one election can merge concurrently, each delta is only ever added once.
+
+    Parameters:
+        election (Election): the coordinator election, defaults to the current election
+    """
+
+    def __init__(self, election: Optional[Election] = None):
+        self.election = resolve_election(election)
+
+    def merge(self, delta: TallyDelta) -> int:
+        """
+        Merges one delta, returns the number of votes it added to the coordinator.
+
+        raises
+            KeyError: if the delta references a polling station, level or party unknown to the coordinator (nothing
+                is merged in that case)
+        """
+        election = self.election
+        area_registry = election.area_registry
+        # the lookups run outside the lock, the high-water marks only grow so a stale read here only means a key is
+        # looked up that turns out to add nothing
+        known_counts = election.delta_counts.get(delta.node_id, {})
+        growth = []
+        for key, votes in delta.counts.items():
+            if votes <= known_counts.get(key, 0):
+                continue
+            lga, name, level_name, party = key
+            polling_station = area_registry.get_polling_station(lga, name)
+            if polling_station is None:
+                raise KeyError(f"unknown polling station {lga}/{name} in delta from {delta.node_id}")
+            level = CandidateLevel[level_name]
+            candidate = polling_station.candidates.candidate_level_map[level].get(party)
+            if candidate is None:
+                raise KeyError(f"{party} has no {level_name} candidate at {lga}/{name} in delta from {delta.node_id}")
+            growth.append((key, votes, polling_station, level, candidate))
+
+        added = 0
+        with election.tally_lock:
+            known_counts = election.delta_counts.setdefault(delta.node_id, {})
+            for key, votes, polling_station, level, candidate in growth:
+                increase = votes - known_counts.get(key, 0)
+                if increase <= 0:
+                    continue
+                candidate.votes += increase
+                level_tally = polling_station.tallies.setdefault(level, {})
+                level_tally[key[3]] = level_tally.get(key[3], 0) + increase
+                known_counts[key] = votes
+                added += increase
+                election.tally_changed(key[0], key[1])
+            known_voted = election.delta_voted.setdefault(delta.node_id, {})
+            for key, voters in delta.voted.items():
+                known_voted[key] = max(known_voted.get(key, 0), voters)
+        return added
+
+    def merge_all(self, deltas: Iterable[TallyDelta]) -> int:
+        return sum(self.merge(delta) for delta in deltas)
+
+    def turnout(self, lga: str, polling_station: str, level: CandidateLevel) -> int:
+        """the distinct voters counted across every merged node for one polling station and level"""
+        with self.election.tally_lock:
+            return sum(voted.get((lga, polling_station, level.name), 0) for voted in self.election.delta_voted.values())
+
+
+def _ingest_node(node_id: str, packets: List, setup: Callable[[Election], None]) -> dict:
+    """runs one ingest node in a worker process: a fresh election fed through a Server, exported as a delta"""
+    from gec_page import Server
+
+    election = Election(node_id)
+    setup(election)
+    server = Server(election=election)
+    for packet in packets:
+        try:
+            server.process(packet)
+        except (AuthenticationError, KeyError, ValueError):
+            continue
+    return TallyDelta.export(node_id, election).to_dict()
+
+
+def default_setup(election: Election):
+    """builds the demo areas and candidates (see areas.init_structure and political_party.init_candidates)"""
+    from areas import init_structure
+    from political_party import init_candidates
+
+    init_structure(election=election)
+    init_candidates(election=election)
+
+
+def run_ingest_nodes(
+    packets_per_node: Dict[str, List],
+    coordinator: Optional[Election] = None,
+    setup: Callable[[Election], None] = default_setup,
+) -> DeltaMerger:
+    """
+    A local stand in for a multi node deployment: each node ingests its packets in its own process, exports a
+    TallyDelta, and the deltas are merged into the coordinator election.
+
+    Parameters:
+        packets_per_node: node id -> the packets that node receives
+        coordinator: the election to merge into (it must already hold the areas and candidates built by setup)
+        setup: a picklable function that builds the areas and candidates of each node's election
+    """
+    merger = DeltaMerger(coordinator)
+    with ProcessPoolExecutor(max_workers=max(len(packets_per_node), 1)) as executor:
+        futures = [
+            executor.submit(_ingest_node, node_id, packets, setup) for node_id, packets in packets_per_node.items()
+        ]
+        for future in futures:
+            merger.merge(TallyDelta.from_dict(future.result()))
+    return merger
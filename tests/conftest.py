@@ -0,0 +1,10 @@
+import pytest
+
+from election import Election, use_election
+
+
+@pytest.fixture(autouse=True)
+def election():
+    """every test runs in its own election so that areas, candidates and votes do not leak between tests"""
+    with use_election(Election("test")) as test_election:
+        yield test_election
@@ -0,0 +1,87 @@
+import threading
+
+from admission import AdmissionController
+from areas import init_structure
+from gec_page import ClientAPI, Server, ServerResponse
+from political_party import init_candidates
+
+
+class GatedServer(Server):
+    """records the polling stations in processing order and holds every packet until the gate is open"""
+
+    def __init__(self):
+        super().__init__()
+        self.stations = []
+        self.gate = threading.Event()
+        self.entered = threading.Event()
+
+    def process(self, data) -> ServerResponse:
+        self.entered.set()
+        self.gate.wait(5)
+        self.stations.append(self.polling_station(data))
+        return super().process(data)
+
+
+def _packet(lga, pc, voter):
+    return ClientAPI().json_request(f"voter-{voter}", "123456789", pc, lga, {"president": "PP1"})
+
+
+def test_queues_are_bounded_and_served_round_robin(election):
+    init_structure()
+    init_candidates()
+    server = GatedServer()
+    controller = AdmissionController(server, max_queue_per_lga=4)
+    with controller:
+        first = controller.submit(_packet("LGA1", "PS1", 0))
+        assert server.entered.wait(5)
+        busy = [controller.submit(_packet("LGA1", "PS1", voter)) for voter in range(1, 4)]
+        quiet = [controller.submit(_packet("LGA1", "PS2", 4))]
+        assert controller.submit(_packet("LGA1", "PS3", 5)).result() == ServerResponse.RETRY_LATER
+        other = [controller.submit(_packet("LGA5", "PS5", voter)) for voter in range(6, 8)]
+        assert controller.metrics().queue_depths == {"LGA1": 4, "LGA5": 2}
+        server.gate.set()
+
+    assert [future.result() for future in [first] + busy + quiet + other] == [ServerResponse.ACCEPTED] * 7
+    # a busy station does not hold up the other stations of its LGA
+    assert server.stations == ["PS1", "PS1", "PS2", "PS5", "PS1", "PS5", "PS1"]
+    metrics = controller.metrics()
+    assert (metrics.admitted, metrics.processed, metrics.shed_queue_full, metrics.queued) == (7, 7, 1, 0)
+    assert election.candidate_registry.get_for_area("Gwugwuru")["PP1"].votes == 7
+
+
+def test_packets_are_shed_above_the_delay_target(election):
+    init_structure()
+    init_candidates()
+    server = GatedServer()
+    server.gate.set()
+    controller = AdmissionController(server, target_delay=0.0)
+    controller.start()
+    assert controller.process(_packet("LGA1", "PS1", 0)) == ServerResponse.ACCEPTED
+    assert controller.metrics().service_time > 0
+
+    server.gate.clear()
+    server.entered.clear()
+    held = controller.submit(_packet("LGA1", "PS1", 1))
+    assert server.entered.wait(5)
+    admitted = controller.submit(_packet("LGA1", "PS2", 2))
+    assert controller.submit(_packet("LGA5", "PS5", 3)).result() == ServerResponse.RETRY_LATER
+    assert controller.metrics().shed_delay == 1
+
+    stopper = threading.Thread(target=controller.stop, kwargs={"drain": False})
+    stopper.start()
+    assert admitted.result(timeout=5) == ServerResponse.RETRY_LATER
+    server.gate.set()
+    stopper.join()
+    assert held.result() == ServerResponse.ACCEPTED
+
+
+def test_packets_are_shed_when_not_running(election):
+    init_structure()
+    init_candidates()
+    controller = AdmissionController(Server())
+    assert controller.process(_packet("LGA1", "PS1", 0)) == ServerResponse.RETRY_LATER
+    with controller:
+        assert controller.process(_packet("LGA1", "PS1", 1)) == ServerResponse.ACCEPTED
+    assert controller.submit(_packet("LGA1", "PS1", 2)).result(timeout=1) == ServerResponse.RETRY_LATER
+    metrics = controller.metrics()
+    assert (metrics.shed_not_running, metrics.shed, metrics.processed) == (2, 2, 1)
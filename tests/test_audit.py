@@ -0,0 +1,92 @@
+import itertools
+import json
+
+from areas import init_structure
+from audit import chunk_boundaries, recount
+from election import Election, use_election
+from gec_page import ClientAPI, Server
+from journal import VoteJournal
+from political_party import init_candidates
+from rejects import RejectCode
+
+
+def test_recount_matches_the_journal(election, tmp_path):
+    init_structure()
+    init_candidates()
+    journal_path = tmp_path / "votes.jsonl"
+    election.journal = VoteJournal(str(journal_path), flush_every=1)
+    server = Server()
+    client_api = ClientAPI()
+    for i, (pc, lga) in enumerate([("PS1", "LGA1"), ("PS2", "LGA1"), ("PS5", "LGA5")] * 20):
+        server.process(client_api.json_request(f"voter {i}", "123456789", pc, lga, {"president": f"PP{i % 2 + 1}"}))
+    election.journal.close()
+
+    assert len(chunk_boundaries(str(journal_path), 4)) == 4
+    report = recount(str(journal_path), workers=4)
+    assert report.records == 60
+    assert report.certified
+
+    # a tampered journal: one vote replayed in another chunk, one party swapped and one unknown station
+    lines = journal_path.read_text().splitlines()
+    swapped = json.loads(lines[1])
+    swapped["votes"]["president"] = "PP1" if swapped["votes"]["president"] == "PP2" else "PP2"
+    lines[1] = json.dumps(swapped)
+    lines.append(lines[0])
+    lines.append(json.dumps({"LGA": "LGA1", "PC": "PS404", "voter_id": -1, "votes": {"president": "PP1"}}))
+    journal_path.write_text("\n".join(lines) + "\n")
+
+    report = recount(str(journal_path), workers=3)
+    assert report.rejects == {RejectCode.ALREADY_VOTED: 1, RejectCode.UNKNOWN_POLLING_STATION: 1}
+    assert {(d.scope, d.area, d.party, d.live - d.recount) for d in report.discrepancies} == {
+        ("station", "PS2", "PP1", -1),
+        ("station", "PS2", "PP2", 1),
+        ("candidate", "Gwugwuru", "PP1", -1),
+        ("candidate", "Gwugwuru", "PP2", 1),
+    }
+
+
+def test_recount_a_journal_shared_by_several_nodes(tmp_path, monkeypatch):
+    journal_path = tmp_path / "votes.jsonl"
+    for node in ("node-1", "node-2"):
+        # every process numbers its voters from 0 again
+        monkeypatch.setattr("voter._voter_ids", itertools.count())
+        with use_election(Election(node)) as election:
+            init_structure()
+            init_candidates()
+            election.journal = VoteJournal(str(journal_path), flush_every=1)
+            server = Server()
+            client_api = ClientAPI()
+            for i in range(5):
+                server.process(client_api.json_request(f"{node} {i}", "123456789", "PS1", "LGA1", {"president": "PP1"}))
+            election.journal.close()
+
+    report = recount(str(journal_path), election=election, workers=2)
+    assert report.records == 10
+    assert not report.rejects
+    assert report.counts[("LGA1", "PS1", "PRESIDENT", "PP1")] == 10
+
+
+def test_recount_does_not_depend_on_the_chunks(election, tmp_path):
+    init_structure()
+    init_candidates()
+    packets_path = tmp_path / "packets.jsonl"
+    records = [
+        {"request_id": "r1", "LGA": "LGA5", "PC": "PS5", "votes": {"president": "PP1"}},
+        {"request_id": "r2", "LGA": "LGA5", "PC": "PS5", "votes": {"president": "PP2"}},
+        # repeats r1's president vote, so its mp vote is rejected with it
+        {"request_id": "r1", "LGA": "LGA5", "PC": "PS5", "votes": {"president": "PP1", "mp": "PP1"}},
+        {"request_id": "r3", "LGA": "LGA5", "PC": "PS5", "votes": {"mp": "PP1"}},
+        {"request_id": "r3", "LGA": "LGA5", "PC": "PS5", "votes": {"president": "PP2"}},
+        {"LGA": "LGA5", "PC": "PS5", "votes": {"president": "PP1"}},
+    ]
+    packets_path.write_text("".join(json.dumps(record) + "\n" for record in records))
+
+    reports = [recount(str(packets_path), workers=workers) for workers in (1, 2, 3, len(records))]
+    assert len(chunk_boundaries(str(packets_path), len(records))) == len(records)
+    assert all(report == reports[0] for report in reports)
+    assert reports[0].rejects == {RejectCode.ALREADY_VOTED: 1}
+    assert reports[0].counts == {
+        ("LGA5", "PS5", "PRESIDENT", "PP1"): 2,
+        ("LGA5", "PS5", "PRESIDENT", "PP2"): 2,
+        ("LGA5", "PS5", "MP", "PP1"): 1,
+    }
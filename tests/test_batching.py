@@ -0,0 +1,75 @@
+from areas import init_structure
+from batching import MicroBatcher
+from dedupe import DedupeCache
+from gec_page import ClientAPI, Server, ServerResponse
+from political_party import init_candidates
+from rejects import RejectCode
+
+
+def test_packets_are_voted_in_station_batches(election):
+    init_structure()
+    init_candidates()
+    client_api = ClientAPI()
+    server = Server(dedupe_cache=DedupeCache())
+    batcher = MicroBatcher(server, max_wait=60, batch_size=3, target_latency=60)
+    packets = [
+        client_api.json_request(f"voter-{voter}", "123456789", "PS1", "LGA1", {"president": "PP1"}, f"r{voter}")
+        for voter in range(3)
+    ]
+    packets.append(client_api.json_request("voter-3", "123456789", "PS5", "LGA5", {"president": "PP3"}))
+    packets.append(client_api.json_request("voter-4", "123456789", "PS99", "LGA5", {"president": "PP1"}))
+    futures = [batcher.submit(packet) for packet in packets]
+
+    with batcher:
+        # the full PS1 group is flushed straight away, the others wait for max_wait (or stop)
+        assert [future.result(timeout=5) for future in futures[:3]] == [ServerResponse.ACCEPTED] * 3
+        assert batcher.metrics().batch_size == 4
+        assert batcher.submit(packets[0]).result() == ServerResponse.DUPLICATE
+    assert [future.result() for future in futures[3:]] == [ServerResponse.REJECTED] * 2
+
+    assert election.candidate_registry.get_for_area("Gwugwuru")["PP1"].votes == 3
+    assert election.rejects.counts() == {
+        ("LGA5", "PS5", RejectCode.NOT_ON_BALLOT): 1,
+        ("LGA5", "PS99", RejectCode.UNKNOWN_POLLING_STATION): 1,
+    }
+    metrics = batcher.metrics()
+    assert (metrics.batches, metrics.packets) == (3, 5)
+
+
+def test_batch_size_backs_off_above_the_latency_target(election):
+    init_structure()
+    init_candidates()
+    batcher = MicroBatcher(Server(), max_wait=0.001, target_latency=0.0, batch_size=8)
+    with batcher:
+        packet = ClientAPI().json_request("voter", "123456789", "PS1", "LGA1", {"president": "PP2"})
+        assert batcher.submit(packet).result(timeout=5) == ServerResponse.ACCEPTED
+    assert batcher.metrics().batch_size == 4
+
+
+def test_retries_and_failing_batches(election):
+    init_structure()
+    init_candidates()
+    client_api = ClientAPI()
+    server = Server(dedupe_cache=DedupeCache())
+    batcher = MicroBatcher(server, max_wait=60, batch_size=8, target_latency=60)
+    packet = client_api.json_request("voter", "123456789", "PS1", "LGA1", {"president": "PP1"}, request_id="r1")
+    first = batcher.submit(packet)
+    retry = batcher.submit(packet)
+    # an int ID makes authentication raise inside vote_many
+    broken = batcher.submit(client_api.json_request("bad", 123456789, "PS1", "LGA1", {"president": "PP1"}, "r2"))
+
+    with batcher:
+        assert retry.result(timeout=5) == ServerResponse.DUPLICATE
+        # flush on the next wake up, the failing batch must not stop the scheduler
+        batcher.max_wait = 0.001
+        fixed = batcher.submit(client_api.json_request("bad", "123456789", "PS2", "LGA1", {"president": "PP1"}, "r3"))
+        assert first.result(timeout=5) == ServerResponse.ACCEPTED
+        assert isinstance(broken.exception(timeout=5), TypeError)
+        assert fixed.result(timeout=5) == ServerResponse.ACCEPTED
+    assert election.candidate_registry.get_for_area("Gwugwuru")["PP1"].votes == 2
+
+    # the failed packet was not counted, so its retry is processed
+    with batcher:
+        retried = batcher.submit(client_api.json_request("bad", "123456789", "PS1", "LGA1", {"president": "PP1"}, "r2"))
+    assert retried.result() == ServerResponse.ACCEPTED
+    assert election.candidate_registry.get_for_area("Gwugwuru")["PP1"].votes == 3
@@ -0,0 +1,37 @@
+from areas import init_structure
+from authentication import NationalInsuranceNumber
+from election import Election, current_election, use_election
+from political_party import CandidateLevel, init_candidates
+from results import get_results
+from voter import Voter
+
+
+def test_elections_are_isolated():
+    first, second = Election("first"), Election("second")
+    polling_stations = init_structure(election=first)
+    init_candidates(election=first)
+    init_structure(election=second)
+    init_candidates(election=second)
+
+    voter = Voter(
+        polling_station_name="PS1",
+        voter_name="John Doe",
+        authentication_strategy=NationalInsuranceNumber(ni_number="123456789"),
+    )
+    voter.votes = {CandidateLevel.PRESIDENT: "PP2"}
+    polling_stations["PS1"].get_ballot().cast_votes(voter)
+
+    assert get_results(CandidateLevel.PRESIDENT, election=first) == {"Gwugwuru": "PP2"}
+    assert get_results(CandidateLevel.PRESIDENT, election=second) == {"Gwugwuru": "HUNG_RESULT"}
+
+
+def test_use_election_scopes_the_current_election():
+    outer = current_election()
+    election = Election("what-if")
+    with use_election(election):
+        assert current_election() is election
+        init_structure()
+        init_candidates()
+    assert current_election() is outer
+    assert election.area_registry.get_for_area("CountryArea") == ["Gwugwuru"]
+    assert election.candidate_registry.get_for_area("Gwugwuru").keys() == {"PP1", "PP2"}
@@ -0,0 +1,103 @@
+import csv
+import gzip
+import json
+
+import pytest
+
+from areas import init_structure
+from export import EXPORT_FIELDS, export_results, iter_result_rows
+from gec_page import ClientAPI, Server
+from political_party import init_candidates
+from results import get_winner_and_leaders
+from snapshots import SnapshotPublisher
+
+
+@pytest.fixture
+def votes(election):
+    init_structure()
+    init_candidates()
+    server = Server()
+    client_api = ClientAPI()
+    ballots = [
+        ("PS1", "LGA1", {"president": "PP1"}),
+        ("PS1", "LGA1", {"president": "PP1"}),
+        ("PS2", "LGA1", {"president": "PP1"}),
+        ("PS2", "LGA1", {"president": "PP2"}),
+        ("PS5", "LGA5", {"president": "PP2", "mp": "PP1"}),
+    ]
+    for i, (pc, lga, ballot) in enumerate(ballots):
+        server.process(client_api.json_request(f"voter {i}", "123456789", pc, lga, ballot))
+    return election
+
+
+def _rows(scope, rows):
+    return [tuple(row[name] for name in EXPORT_FIELDS[1:]) for row in rows if row["scope"] == scope]
+
+
+def test_result_rows(votes):
+    rows = list(iter_result_rows(SnapshotPublisher().publish()))
+
+    assert sorted(_rows("station", rows)) == [
+        ("MP", "LGA5", "PS5", "PP1", 1, "PP1", None),
+        ("PRESIDENT", "LGA1", "PS1", "PP1", 2, "PP1", None),
+        ("PRESIDENT", "LGA1", "PS2", "PP1", 1, "HUNG_RESULT", None),
+        ("PRESIDENT", "LGA1", "PS2", "PP2", 1, "HUNG_RESULT", None),
+        ("PRESIDENT", "LGA5", "PS5", "PP2", 1, "PP2", None),
+    ]
+    area_rows = _rows("area", rows)
+    assert ("PRESIDENT", "", "Gwugwuru", "PP1", 3, "PP1", None) in area_rows
+    assert ("PRESIDENT", "", "Gwugwuru", "PP2", 2, "PP1", None) in area_rows
+    assert ("MP", "", "CS2", "PP1", 1, "PP1", None) in area_rows
+    # areas without candidates still get a row
+    assert ("MP", "", "CS1", "", 0, "NO_RESULT", None) in area_rows
+    assert ("GOVERNOR", "", "AA0", "", 0, "NO_RESULT", None) in area_rows
+    assert len([row for row in area_rows if row[0] == "MAYOR"]) == 10
+    assert sorted(_rows("level", rows)) == [
+        ("MP", "", "", "PP1", 1, "PP1", 1),
+        ("PRESIDENT", "", "", "PP1", 3, "PP1", 1),
+        ("PRESIDENT", "", "", "PP2", 2, "PP1", 0),
+    ]
+
+
+def test_export_formats_and_chunks(votes, tmp_path):
+    expected = list(iter_result_rows(SnapshotPublisher().publish()))
+
+    csv_path = tmp_path / "results.csv.gz"
+    # a chunk size that does not divide the row count, so the last chunk is partial
+    assert len(expected) % 4
+    assert export_results(str(csv_path), chunk_size=4) == len(expected)
+    with gzip.open(csv_path, "rt", newline="") as f:
+        reader = csv.DictReader(f)
+        assert tuple(reader.fieldnames) == EXPORT_FIELDS
+        exported = list(reader)
+    assert [(row["scope"], row["area"], row["party"], int(row["votes"])) for row in exported] == [
+        (row["scope"], row["area"], row["party"], row["votes"]) for row in expected
+    ]
+
+    jsonl_path = tmp_path / "results.jsonl"
+    assert export_results(str(jsonl_path), fmt="jsonl", chunk_size=1, compress=False) == len(expected)
+    assert [json.loads(line) for line in jsonl_path.read_text().splitlines()] == expected
+
+    with pytest.raises(ValueError):
+        export_results(str(tmp_path / "results.xml"), fmt="xml")
+    with pytest.raises(ValueError):
+        export_results(str(jsonl_path), chunk_size=0)
+
+
+def test_export_reads_the_publisher_snapshot(votes, tmp_path):
+    publisher = SnapshotPublisher()
+    published = publisher.publish()
+    export_results(str(tmp_path / "results.jsonl"), fmt="jsonl", publisher=publisher)
+    assert publisher.current() is published
+
+    Server().process(ClientAPI().json_request("late", "123456789", "PS3", "LGA1", {"president": "PP2"}))
+    export_results(str(tmp_path / "results.jsonl"), fmt="jsonl", publisher=publisher)
+    assert publisher.current().version == published.version + 1
+    rows = [json.loads(line) for line in (tmp_path / "results.jsonl").read_text().splitlines()]
+    assert ("PRESIDENT", "LGA1", "PS3", "PP2", 1, "PP2", None) in _rows("station", rows)
+
+
+def test_winner_and_leaders():
+    assert get_winner_and_leaders({"PP1": 2, "PP2": 2, "PP3": 1}) == ("HUNG_RESULT", ["PP1", "PP2"])
+    assert get_winner_and_leaders({"PP1": 2, "PP2": 1}) == ("PP1", ["PP1"])
+    assert get_winner_and_leaders({}) == ("NO_RESULT", [])
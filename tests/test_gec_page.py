@@ -0,0 +1,144 @@
+import pstats
+
+import pytest
+
+from areas import init_structure
+from dedupe import DedupeCache
+from gec_page import ClientAPI, Server, ServerResponse
+from political_party import Candidate, CandidateLevel, PoliticalParty, init_candidates
+from profiling import ServingProfiler
+from rejects import RejectCode
+
+
+def test_retried_packets_are_acknowledged_once(election):
+    init_structure()
+    init_candidates()
+    server = Server(dedupe_cache=DedupeCache(max_entries=10))
+    client_api = ClientAPI()
+    json_vote = client_api.json_request(
+        voter_name="Jon Doe", voter_id="123456789", pc="PS1", lga="LGA1", votes={"president": "PP1"}, request_id="r1"
+    )
+    str_vote = client_api.str_request(
+        "voter_name=John P, voter_id=123456789, pc=PS1, lga=LGA1, president_vote=PP1", request_id="r2"
+    )
+
+    assert client_api.send_request(server, json_vote) == ServerResponse.ACCEPTED
+    assert client_api.send_request(server, json_vote) == ServerResponse.DUPLICATE
+    assert client_api.send_request(server, str_vote) == ServerResponse.ACCEPTED
+    assert client_api.send_request(server, str_vote) == ServerResponse.DUPLICATE
+
+    president = election.candidate_registry.get_for_area("Gwugwuru")["PP1"]
+    assert president.level == CandidateLevel.PRESIDENT
+    assert president.votes == 2
+
+
+def test_dedupe_cache_is_bounded():
+    cache = DedupeCache(max_entries=2)
+    for request_id in ("a", "b", "c"):
+        cache.add(request_id)
+    assert len(cache) == 2
+    assert "a" not in cache
+    assert "b" in cache and "c" in cache
+
+    expired = DedupeCache(ttl=0)
+    expired.add("a")
+    assert "a" not in expired
+
+
+def test_in_flight_retries_are_duplicates(election):
+    init_structure()
+    init_candidates()
+    server = Server(dedupe_cache=DedupeCache())
+    client_api = ClientAPI()
+    packet = client_api.json_request("Jon Doe", "123456789", "PS1", "LGA1", {"president": "PP1"}, request_id="r1")
+    retried = []
+    dispatch = server.dispatch
+
+    def dispatch_with_retry(data):
+        if not retried:
+            # the terminal times out and retries while the original is still being processed
+            retried.append(server.process(data))
+        return dispatch(data)
+
+    server.dispatch = dispatch_with_retry
+    assert server.process(packet) == ServerResponse.ACCEPTED
+    assert retried == [ServerResponse.DUPLICATE]
+    assert election.candidate_registry.get_for_area("Gwugwuru")["PP1"].votes == 1
+
+    # a packet that fails is forgotten, so its retry is processed
+    malformed = {"request_id": "r2", "LGA": "LGA1"}
+    with pytest.raises(KeyError):
+        Server(dedupe_cache=server.dedupe_cache).process(malformed)
+    assert server.dedupe_cache.reserve("r2")
+    assert not server.dedupe_cache.reserve("r2")
+
+
+def test_profiler_dumps_dispatch(tmp_path):
+    init_structure()
+    init_candidates()
+    profiler = ServingProfiler(directory=str(tmp_path), interval=3600, keep=1)
+    server = Server(profiler=profiler)
+    client_api = ClientAPI()
+    for _ in range(2):
+        client_api.send_request(
+            server, client_api.str_request("voter_name=John P, voter_id=123456789, pc=PS1, lga=LGA1, president_vote=PP1")
+        )
+        profiler.dump()
+    profiler.close()
+
+    assert len(list(tmp_path.glob("profile-*.prof"))) == 1
+    assert len(list(tmp_path.glob("tracemalloc-*.snapshot"))) == 1
+    stats = pstats.Stats(str(next(tmp_path.glob("profile-*.prof"))))
+    assert any(function == "vote" for _, _, function in stats.stats)
+
+
+def test_unknown_polling_stations_are_rejected(election):
+    init_structure()
+    init_candidates()
+    server = Server()
+    client_api = ClientAPI()
+    unknown = client_api.json_request("Jon Doe", "123456789", "PS99", "LGA99", {"president": "PP1"})
+    assert client_api.send_request(server, unknown) == ServerResponse.REJECTED
+    assert election.rejects.counts() == {("LGA99", "PS99", RejectCode.UNKNOWN_POLLING_STATION): 1}
+    assert "LGA99" not in election.area_registry.get_for_area("LocalGovernmentArea")
+
+    ballot = election.area_registry.get_ballot("LGA1", "PS1")
+    assert ballot.polling_station is election.area_registry.get_polling_station("LGA1", "PS1")
+    vote = client_api.json_request("Jon Doe", "123456789", "PS1", "LGA1", {"president": "PP1"})
+    assert client_api.send_request(server, vote) == ServerResponse.ACCEPTED
+    assert election.area_registry.get_ballot("LGA1", "PS1") is ballot
+
+    PoliticalParty("PP3").register(Candidate(level=CandidateLevel.PRESIDENT, name="New", area="Gwugwuru"))
+    assert "PP3" in election.area_registry.get_ballot("LGA1", "PS1").candidates.presidential_candidates
+
+
+def test_votes_reuse_the_station_candidate_map(election, monkeypatch, capsys):
+    from areas import PollingStation
+
+    init_structure()
+    init_candidates()
+    server = Server()
+    client_api = ClientAPI()
+    station = election.area_registry.get_polling_station("LGA1", "PS1")
+    election.area_registry.get_ballot("LGA1", "PS1")
+    candidate_level_map = station.candidate_level_map
+    # count every walk of the parent chain from here on
+    builds = []
+    candidates = PollingStation.candidates.fget
+    monkeypatch.setattr(PollingStation, "candidates", property(lambda self: builds.append(self) or candidates(self)))
+
+    for i in range(3):
+        vote = client_api.json_request(f"voter {i}", "123456789", "PS1", "LGA1", {"president": "PP1"})
+        assert client_api.send_request(server, vote) == ServerResponse.ACCEPTED
+    assert station.candidate_level_map is candidate_level_map
+    assert builds == []
+
+    capsys.readouterr()
+    off_ballot = client_api.json_request("voter 3", "123456789", "PS1", "LGA1", {"president": "PP9"})
+    assert client_api.send_request(server, off_ballot) == ServerResponse.REJECTED
+    assert election.rejects.counts()[("LGA1", "PS1", RejectCode.NOT_ON_BALLOT)] == 1
+    assert "not on ballot" not in capsys.readouterr().out
+
+    PoliticalParty("PP3").register(Candidate(level=CandidateLevel.PRESIDENT, name="New", area="Gwugwuru"))
+    assert "PP3" in station.candidate_level_map[CandidateLevel.PRESIDENT]
+    assert builds
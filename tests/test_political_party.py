@@ -1,5 +1,8 @@
+import pytest
+
 from areas import init_structure
-from political_party import Candidate, CandidateLevel, PoliticalParty
+from political_party import Candidate, CandidateLevel, PoliticalParty, load_candidates
+from registries import CandidateRegistrationError
 
 
 def test_candidates():
@@ -20,5 +23,48 @@ def test_candidates():
         print("validated we cannot register a candidate without a valid area")
 
 
+def test_register_many_is_atomic(election):
+    init_structure()
+    party = PoliticalParty(party_name="PP1")
+    party.register(Candidate(level=CandidateLevel.PRESIDENT, name="John Doe", area="Gwugwuru"))
+    batch = [
+        Candidate(level=CandidateLevel.MP, name="James B", area="CS2"),
+        Candidate(level=CandidateLevel.MP, name="James C", area="CS2"),
+        Candidate(level=CandidateLevel.MP, name="Jane D", area="DOESNT_EXIST"),
+        Candidate(level=CandidateLevel.PRESIDENT, name="John P", area="Gwugwuru"),
+    ]
+    with pytest.raises(CandidateRegistrationError) as error:
+        party.register_many(batch)
+    assert len(error.value.errors) == 3
+    assert list(party.candidate_registry_instance.entries) == ["Gwugwuru"]
+    assert all(candidate.party is None for candidate in batch)
+
+    party.register_many(batch[:1])
+    assert batch[0].party == "PP1"
+    assert election.candidate_registry.get_for_area("CS2") == {"PP1": batch[0]}
+
+
+def test_load_candidates(election, tmp_path):
+    init_structure()
+    invalid = tmp_path / "invalid.csv"
+    invalid.write_text("party,level,area,name\nPP1,president,Gwugwuru,John Doe\nPP2,senator,CS1,X\nPP2,mp,CS9,Y\n")
+    with pytest.raises(CandidateRegistrationError) as error:
+        load_candidates(str(invalid))
+    assert len(error.value.errors) == 2
+    assert list(election.candidate_registry.candidates()) == []
+
+    valid = tmp_path / "candidates.jsonl"
+    valid.write_text(
+        '{"party": "PP1", "level": "president", "area": "Gwugwuru", "name": "John Doe"}\n'
+        '{"party": "PP2", "level": "mp", "area": "CS1", "name": "Tim D"}\n'
+    )
+    loaded = load_candidates(str(valid))
+    assert {party: [candidate.name for candidate in candidates] for party, candidates in loaded.items()} == {
+        "PP1": ["John Doe"],
+        "PP2": ["Tim D"],
+    }
+    assert election.candidate_registry.get_for_area("CS1")["PP2"].party == "PP2"
+
+
 if __name__ == "__main__":
     test_candidates()
@@ -0,0 +1,123 @@
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+
+import pytest
+
+from areas import PollingStation, init_structure
+from gec_page import ClientAPI, Server, ServerResponse
+from pco import PCO
+from political_party import Candidate, CandidateLevel, PoliticalParty, init_candidates
+from replication import ReplicationFollower, ReplicationLog, ReplicationServer
+from results import get_results
+
+
+def _state(election):
+    return (
+        {level: get_results(level, election=election) for level in CandidateLevel},
+        {(lga, station.name): station.tallies for lga, station in election.area_registry.polling_stations()},
+        {(candidate.party, candidate.area): candidate.votes for candidate in election.candidate_registry.candidates()},
+    )
+
+
+def test_follower_streams_and_catches_up(election):
+    init_structure()
+    init_candidates()
+    log = election.replication = ReplicationLog(election, max_records=5)
+    server = Server()
+    client_api = ClientAPI()
+    voters = iter(range(1000))
+
+    def vote(count, pc="PS1", lga="LGA1", party="PP1"):
+        for _ in range(count):
+            server.process(client_api.json_request(f"voter-{next(voters)}", "123456789", pc, lga, {"president": party}))
+
+    primary = ReplicationServer(log, authkey=b"test", heartbeat=0.05)
+    primary.start()
+    follower = ReplicationFollower(primary.address, authkey=b"test", retry_interval=0.05)
+    try:
+        follower.start()
+        vote(3)
+        assert follower.wait_for(3, timeout=5)
+        assert _state(follower.election) == _state(election)
+
+        # a short disconnect catches up from the retained records
+        follower.stop()
+        vote(2, pc="PS5", lga="LGA5", party="PP2")
+        standby = follower.election
+        follower.start()
+        assert follower.wait_for(5, timeout=5)
+        assert follower.election is standby
+        assert _state(follower.election) == _state(election)
+
+        # a long one from a checkpoint plus tail
+        follower.stop()
+        vote(6, party="PP2")
+        follower.start()
+        assert follower.wait_for(11, timeout=5)
+        assert follower.election is not standby
+        PoliticalParty("PP1").register(Candidate(level=CandidateLevel.MP, name="Jane", area="CS1"))
+        vote(1, pc="PS2")
+        assert follower.wait_for(log.seq, timeout=5)
+        assert _state(follower.election) == _state(election)
+        assert follower.lag().records == 0
+    finally:
+        promoted = follower.promote()
+        primary.stop()
+
+    assert follower.lag().connected is False
+    takeover = Server(election=promoted)
+    packet = client_api.json_request("new voter", "123456789", "PS1", "LGA1", {"president": "PP1", "mp": "PP1"})
+    assert takeover.process(packet) == ServerResponse.ACCEPTED
+    assert promoted.candidate_registry.get_for_area("Gwugwuru")["PP1"].votes == 5
+
+
+def test_polling_stations_are_keyed_by_lga(election):
+    init_structure()
+    init_candidates()
+    lgas = election.area_registry.get_polling_station("LGA1", "PS1").parent.administrative_area.area_registry_instance
+    log = election.replication = ReplicationLog(election)
+    # a second PS1, in LGA2, both before (checkpoint) and after (records) the follower connects
+    lgas.entries["LGA2"].add_child(PollingStation(name="PS1", pco=PCO()))
+    primary = ReplicationServer(log, authkey=b"test", heartbeat=0.05)
+    primary.start()
+    follower = ReplicationFollower(primary.address, authkey=b"test", retry_interval=0.05)
+    try:
+        with pytest.raises(AuthenticationError):
+            Client(primary.address, authkey=b"wrong")
+        follower.start()
+        lgas.entries["LGA3"].add_child(PollingStation(name="PS1", pco=PCO()))
+        server = Server()
+        for lga in ("LGA1", "LGA2", "LGA3"):
+            server.process(ClientAPI().json_request(f"voter {lga}", "123456789", "PS1", lga, {"president": "PP1"}))
+        assert follower.wait_for(log.seq, timeout=5)
+        assert _state(follower.election) == _state(election)
+        stations = follower.election.area_registry.polling_stations()
+        assert {lga for lga, station in stations if station.name == "PS1"} == {"LGA1", "LGA2", "LGA3"}
+    finally:
+        follower.stop()
+        primary.stop()
+
+
+def test_follower_resyncs_after_diverging(election):
+    init_structure()
+    init_candidates()
+    log = election.replication = ReplicationLog(election)
+    primary = ReplicationServer(log, authkey=b"test", heartbeat=0.05)
+    primary.start()
+    follower = ReplicationFollower(primary.address, authkey=b"test", retry_interval=0.05)
+    try:
+        follower.start()
+        server = Server()
+        server.process(ClientAPI().json_request("voter 1", "123456789", "PS1", "LGA1", {"president": "PP1"}))
+        assert follower.wait_for(log.seq, timeout=5)
+        # a record the standby cannot apply
+        log.vote("LGA1", "PS404", 999, {CandidateLevel.PRESIDENT: "PP1"})
+        server.process(ClientAPI().json_request("voter 2", "123456789", "PS2", "LGA1", {"president": "PP2"}))
+        assert follower.wait_for(log.seq, timeout=5)
+        lag = follower.lag()
+        assert lag.skipped == 1
+        assert "PS404" in lag.failure
+        assert _state(follower.election) == _state(election)
+    finally:
+        follower.stop()
+        primary.stop()
@@ -0,0 +1,38 @@
+from areas import init_structure
+from gec_page import Server
+from political_party import CandidateLevel, init_candidates
+from results import get_results
+from simulation import ElectionSimulator
+
+
+def test_simulated_votes_feed_the_tallies(election):
+    init_structure()
+    init_candidates()
+    simulator = ElectionSimulator(
+        preferences={CandidateLevel.PRESIDENT: {"Gwugwuru": {"PP1": 0.9, "PP2": 0.1}}}, voters_per_station=200, seed=1
+    )
+    votes = simulator.simulate()
+    simulator.apply(votes)
+
+    candidates = election.candidate_registry.get_for_area("Gwugwuru")
+    assert candidates["PP1"].votes + candidates["PP2"].votes == 10 * 200
+    assert election.candidate_registry.get_for_area("CS2")["PP1"].votes == 5 * 200
+    assert get_results(CandidateLevel.PRESIDENT) == {"Gwugwuru": "PP1"}
+
+    probabilities = simulator.win_probabilities(CandidateLevel.PRESIDENT, trials=100)
+    assert probabilities == {"Gwugwuru": {"PP1": 1.0}}
+    assert simulator.win_probabilities(CandidateLevel.MP, trials=10) == {"CS1": {"NO_RESULT": 1.0}, "CS2": {"PP1": 1.0}}
+
+
+def test_simulated_packets_drive_the_server(election):
+    init_structure()
+    init_candidates()
+    simulator = ElectionSimulator(voters_per_station=3, seed=2)
+    server = Server()
+    packets = list(simulator.packets())
+    assert len(packets) == 30
+    for packet in packets:
+        server.process(packet)
+
+    candidates = election.candidate_registry.get_for_area("Gwugwuru")
+    assert candidates["PP1"].votes + candidates["PP2"].votes == 30
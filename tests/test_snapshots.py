@@ -0,0 +1,80 @@
+import time
+
+from areas import init_structure
+from gec_page import ClientAPI, Server
+from political_party import Candidate, CandidateLevel, PoliticalParty, init_candidates
+from results import get_results
+from snapshots import SnapshotPublisher, copy_tallies
+
+
+def test_snapshots_are_versioned_and_copy_on_write(election):
+    init_structure()
+    init_candidates()
+    publisher = SnapshotPublisher()
+    server = Server()
+    client_api = ClientAPI()
+    first = publisher.current()
+    assert first.version == 1
+    assert first.results(CandidateLevel.PRESIDENT) == {"Gwugwuru": "HUNG_RESULT"}
+    assert publisher.publish() is first
+
+    server.process(client_api.json_request("A", "123456789", "PS1", "LGA1", {"president": "PP1"}))
+    second = publisher.publish()
+    assert second.version == 2
+    assert first.results(CandidateLevel.PRESIDENT) == {"Gwugwuru": "HUNG_RESULT"}
+    assert second.results(CandidateLevel.PRESIDENT) == get_results(CandidateLevel.PRESIDENT)
+    assert second.station_tallies[("LGA1", "PS1")][CandidateLevel.PRESIDENT] == {"PP1": 1}
+    assert second.station_tallies[("LGA5", "PS5")] is first.station_tallies[("LGA5", "PS5")]
+    assert second.age() >= 0
+
+
+def test_background_publishing(election):
+    init_structure()
+    init_candidates()
+    publisher = SnapshotPublisher(interval=0.01)
+    publisher.start()
+    try:
+        Server().process(ClientAPI().json_request("A", "123456789", "PS1", "LGA1", {"president": "PP2"}))
+        for _ in range(500):
+            if publisher.current().results(CandidateLevel.PRESIDENT) == {"Gwugwuru": "PP2"}:
+                break
+            time.sleep(0.01)
+        assert publisher.current().results(CandidateLevel.PRESIDENT) == {"Gwugwuru": "PP2"}
+    finally:
+        publisher.stop()
+
+
+
+def _contents(snapshot):
+    candidate_votes = snapshot.candidate_votes
+    station_tallies = snapshot.station_tallies
+    return (
+        dict(snapshot.areas),
+        {level: {area: dict(votes) for area, votes in areas.items()} for level, areas in candidate_votes.items()},
+        {key: {level: dict(tally) for level, tally in tallies.items()} for key, tallies in station_tallies.items()},
+    )
+
+
+def test_snapshots_copy_only_the_changed_stations(election):
+    init_structure()
+    init_candidates()
+    publisher = SnapshotPublisher()
+    server = Server()
+    client_api = ClientAPI()
+    first = publisher.publish()
+
+    server.process(client_api.json_request("A", "123456789", "PS1", "LGA1", {"president": "PP1"}))
+    server.process(client_api.json_request("B", "123456789", "PS5", "LGA5", {"president": "PP2", "mp": "PP1"}))
+    changes = copy_tallies(election, since=(first.tally_version, first.structure_version))
+    assert not changes.full
+    assert changes.station_tallies.keys() == {("LGA1", "PS1"), ("LGA5", "PS5")}
+    second = publisher.publish()
+    assert _contents(second) == _contents(SnapshotPublisher().publish())
+    assert second.station_tallies[("LGA1", "PS2")] is first.station_tallies[("LGA1", "PS2")]
+
+    # a new candidate changes the shape of the election, which takes a full copy
+    PoliticalParty("PP3").register(Candidate(level=CandidateLevel.PRESIDENT, name="New", area="Gwugwuru"))
+    third = publisher.publish()
+    assert third.version == 3
+    assert third.candidate_votes[CandidateLevel.PRESIDENT]["Gwugwuru"] == {"PP1": 1, "PP2": 1, "PP3": 0}
+    assert _contents(third) == _contents(SnapshotPublisher().publish())
@@ -0,0 +1,60 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from areas import init_structure
+from gec_page import ClientAPI
+from political_party import CandidateLevel, init_candidates
+from results import get_results
+from tally_delta import DeltaMerger, TallyDelta, run_ingest_nodes
+
+
+def test_deltas_merge_commutatively_and_idempotently(election):
+    init_structure()
+    init_candidates()
+    client_api = ClientAPI()
+    packets = {
+        "north": [
+            client_api.json_request("A", "123456789", "PS1", "LGA1", {"president": "PP1"}),
+            client_api.json_request("B", "123456789", "PS2", "LGA1", {"president": "PP1"}),
+        ],
+        "south": [
+            client_api.json_request("C", "123456789", "PS5", "LGA5", {"president": "PP2", "mp": "PP1"}),
+            client_api.json_request("D", "123456789", "PS6", "LGA5", {"president": "PP1"}),
+        ],
+    }
+    merger = run_ingest_nodes(packets, coordinator=election)
+
+    assert election.candidate_registry.get_for_area("Gwugwuru")["PP1"].votes == 3
+    assert election.candidate_registry.get_for_area("Gwugwuru")["PP2"].votes == 1
+    assert get_results(CandidateLevel.MP) == {"CS1": "NO_RESULT", "CS2": "PP1"}
+    assert merger.turnout("LGA5", "PS5", CandidateLevel.PRESIDENT) == 1
+
+    older = TallyDelta("south", counts={("LGA5", "PS5", "PRESIDENT", "PP2"): 0})
+    replayed = TallyDelta.from_dict(
+        {"node_id": "north", "counts": [["LGA1", "PS1", "PRESIDENT", "PP1", 1]], "voted": []}
+    )
+    assert merger.merge_all([older, replayed, replayed]) == 0
+    assert election.candidate_registry.get_for_area("Gwugwuru")["PP1"].votes == 3
+
+    grown = TallyDelta("north", counts={("LGA1", "PS1", "PRESIDENT", "PP1"): 4})
+    assert merger.merge(grown) == 3
+    assert merger.merge(grown) == 0
+    assert election.candidate_registry.get_for_area("Gwugwuru")["PP1"].votes == 6
+
+
+def test_mergers_of_one_election_share_their_high_water_marks(election):
+    init_structure()
+    init_candidates()
+    key = ("LGA1", "PS1", "PRESIDENT", "PP1")
+    first = DeltaMerger(election)
+    assert first.merge(TallyDelta("north", counts={key: 5}, voted={key[:3]: 5})) == 5
+    # a second merger (e.g. after a coordinator restart) must not add the same votes again
+    second = DeltaMerger(election)
+    assert second.merge(TallyDelta("north", counts={key: 5})) == 0
+    assert second.turnout("LGA1", "PS1", CandidateLevel.PRESIDENT) == 5
+
+    deltas = [TallyDelta("north", counts={key: votes}) for votes in range(1, 201)] * 4
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        added = sum(executor.map(lambda delta: DeltaMerger(election).merge(delta), deltas))
+    assert added == 195
+    assert election.candidate_registry.get_for_area("Gwugwuru")["PP1"].votes == 200
+    assert election.area_registry.get_polling_station("LGA1", "PS1").tallies[CandidateLevel.PRESIDENT]["PP1"] == 200
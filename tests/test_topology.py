@@ -0,0 +1,41 @@
+import numpy as np
+
+from areas import init_structure
+from topology import NO_PARENT
+
+
+def test_topology(election):
+    init_structure()
+    topology = election.topology
+
+    aa1 = topology.id_of("AdministrativeArea", "AA1")
+    lga1 = topology.id_of("LocalGovernmentArea", "LGA1")
+    lga5 = topology.id_of("LocalGovernmentArea", "LGA5")
+    ps1 = topology.id_of("PollingStation", ("LGA1", "PS1"))
+
+    # ancestors of a polling station resolve in one pass
+    ancestors = topology.ancestors("PollingStation", np.array([ps1]))
+    assert topology.name_of("LocalGovernmentArea", ancestors["LocalGovernmentArea"][0]) == "LGA1"
+    assert topology.name_of("AdministrativeArea", ancestors["AdministrativeArea"][0]) == "AA1"
+    assert topology.name_of("Constituency", ancestors["Constituency"][0]) == "CS1"
+    assert topology.name_of("CountryArea", ancestors["CountryArea"][0]) == "Gwugwuru"
+
+    # subtree queries
+    stations = topology.descendants("AdministrativeArea", aa1)
+    assert sorted(topology.name_of("PollingStation", i)[1] for i in stations) == [f"PS{i}" for i in range(5)]
+    assert list(topology.children("LocalGovernmentArea", lga5, "PollingStation")) == list(range(5, 10))
+    assert len(topology.children("AdministrativeArea", topology.id_of("AdministrativeArea", "AA0"), "LocalGovernmentArea")) == 0
+
+    # per subtree aggregation
+    per_aa = topology.aggregate(np.ones(topology.size("PollingStation")), "AdministrativeArea")
+    assert per_aa[aa1] == 5 and per_aa.sum() == 10
+    per_lga = topology.aggregate(np.ones((topology.size("PollingStation"), 2)), "LocalGovernmentArea")
+    assert per_lga[lga1].tolist() == [5, 5]
+
+    # the topology can be rebuilt from the registries and stays in sync with add_child
+    rebuilt = election.area_registry.rebuild_topology()
+    assert rebuilt.id_of("PollingStation", ("LGA1", "PS1")) is not None
+    assert rebuilt.parent_array("LocalGovernmentArea", "Constituency").tolist() == topology.parent_array(
+        "LocalGovernmentArea", "Constituency"
+    ).tolist()
+    assert NO_PARENT not in rebuilt.parent_array("PollingStation", "LocalGovernmentArea")
@@ -1,6 +1,7 @@
 from areas import init_structure
 from authentication import NationalInsuranceNumber, AuthenticationError
 from political_party import CandidateLevel, init_candidates
+from rejects import RejectCode
 from voter import Voter
 
 
@@ -50,5 +51,47 @@ def test_votes():
         print(f"successfully prevented unauthenticated voter from voting: {e}")
 
 
+def test_bulk_votes(election, capsys):
+    polling_stations = init_structure()
+    init_candidates()
+    capsys.readouterr()
+
+    def voter(polling_station_name, ni_number, votes):
+        new_voter = Voter(
+            polling_station_name=polling_station_name,
+            voter_name="John Doe",
+            authentication_strategy=NationalInsuranceNumber(ni_number=ni_number),
+        )
+        new_voter.votes = votes
+        return new_voter
+
+    valid = voter("PS1", "123456789", {CandidateLevel.PRESIDENT: "PP1"})
+    voters = [
+        valid,
+        valid,
+        voter("PS2", "123456789", {CandidateLevel.PRESIDENT: "PP1"}),
+        voter("PS1", "1234", {CandidateLevel.PRESIDENT: "PP1"}),
+        voter("PS1", "123456789", {CandidateLevel.PRESIDENT: "PP3"}),
+        voter("PS1", "123456789", {None: "PP1"}),
+        voter("PS1", "123456789", {CandidateLevel.PRESIDENT: "PP2"}),
+    ]
+    result = polling_stations["PS1"].vote_many(voters)
+
+    assert result.accepted == 2
+    assert [record.code for record in result.rejected] == [
+        RejectCode.ALREADY_VOTED,
+        RejectCode.WRONG_POLLING_STATION,
+        RejectCode.AUTHENTICATION_FAILED,
+        RejectCode.NOT_ON_BALLOT,
+        RejectCode.UNKNOWN_LEVEL,
+    ]
+    assert capsys.readouterr().out == ""
+    assert polling_stations["PS1"].tallies == {CandidateLevel.PRESIDENT: {"PP1": 1, "PP2": 1}}
+    assert len(election.rejects) == 5
+    assert election.rejects.counts(polling_station="PS1")[("LGA1", "PS1", RejectCode.ALREADY_VOTED)] == 1
+    assert election.rejects.page(offset=1, limit=2) == result.rejected[1:3]
+    assert election.rejects.page(code=RejectCode.NOT_ON_BALLOT) == [result.rejected[3]]
+
+
 if __name__ == "__main__":
     test_votes()
@@ -0,0 +1,188 @@
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+# the area levels of the electoral structure, keyed by their AreaClass.__name__
+COUNTRY = "CountryArea"
+ADMINISTRATIVE_AREA = "AdministrativeArea"
+CONSTITUENCY = "Constituency"
+LOCAL_GOVERNMENT_AREA = "LocalGovernmentArea"
+POLLING_STATION = "PollingStation"
+
+LEVELS = (COUNTRY, ADMINISTRATIVE_AREA, CONSTITUENCY, LOCAL_GOVERNMENT_AREA, POLLING_STATION)
+
+# child level -> the parent levels a node of that level can be attached to
+PARENT_LEVELS = {
+    COUNTRY: (),
+    CONSTITUENCY: (),
+    ADMINISTRATIVE_AREA: (COUNTRY,),
+    LOCAL_GOVERNMENT_AREA: (ADMINISTRATIVE_AREA, CONSTITUENCY),
+    POLLING_STATION: (LOCAL_GOVERNMENT_AREA,),
+}
+
+# polling stations are only unique within their local government area so they are keyed by (lga, polling station)
+AreaKey = Union[str, Tuple[str, str]]
+
+NO_PARENT = -1
+
+
+class AreaTopology:
+    """
+    An integer indexed representation of the area graph.
+
+    Every area is given a dense integer id within its level (ids are handed out in insertion order) and every
+    child -> parent edge is stored in a flat parent array, e.g.
+
+    parents[("LocalGovernmentArea", "AdministrativeArea")] = [1, 1, 1, 1, 1, 2, 2, 2, 2, 2]
+
+    reads: lga 0 to 4 belong to AA1 and lga 5 to 9 belong to AA2. Unattached nodes have a parent of NO_PARENT (-1).
+    The downward direction is kept in CSR form (offsets into a flat array of child ids), so that the children of
+    parent p are indices[offsets[p]:offsets[p + 1]].
+
+    Edges are appended as they are created (see HierarchicalAreaNode._register_child) and the numpy arrays are only
+    materialised when queried, the cache being thrown away whenever the graph changes.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, Dict[AreaKey, int]] = {level: {} for level in LEVELS}
+        self._names: Dict[str, List[AreaKey]] = {level: [] for level in LEVELS}
+        self._parents: Dict[Tuple[str, str], List[int]] = {
+            (level, parent_level): [] for level, parent_levels in PARENT_LEVELS.items() for parent_level in parent_levels
+        }
+        self._cache: dict = {}
+
+    @classmethod
+    def from_registry(cls, instances) -> "AreaTopology":
+        """
+        Builds a topology from the AreaRegistry._instances structure, i.e. {AreaClass.__name__: {name: instance}}
+        where each instance holds the children of the named area in its entries.
+        """
+        topology = cls()
+        for level in (COUNTRY, CONSTITUENCY, ADMINISTRATIVE_AREA, LOCAL_GOVERNMENT_AREA):
+            for name, registry_instance in instances.get(level, {}).items():
+                topology.add_area(level, name)
+                for child in registry_instance.entries.values():
+                    topology.link(level, name, child.__class__.__name__, child.name)
+        return topology
+
+    def __len__(self):
+        return sum(len(names) for names in self._names.values())
+
+    def size(self, level: str) -> int:
+        return len(self._names[level])
+
+    def add_area(self, level: str, key: AreaKey) -> int:
+        """returns the id of the area, allocating one (with no parents) if the area is new"""
+        ids = self._ids[level]
+        area_id = ids.get(key)
+        if area_id is not None:
+            return area_id
+        area_id = len(self._names[level])
+        ids[key] = area_id
+        self._names[level].append(key)
+        for parent_level in PARENT_LEVELS[level]:
+            self._parents[(level, parent_level)].append(NO_PARENT)
+        self._cache.clear()
+        return area_id
+
+    def link(self, parent_level: str, parent_name: str, child_level: str, child_name: str) -> int:
+        """
+        Records a parent -> child edge, returns the child id.
+        Polling stations are keyed by (lga, polling station) so the parent name is used to build the child key.
+        """
+        if parent_level not in PARENT_LEVELS[child_level]:
+            raise ValueError(f"{child_level} cannot be a child of {parent_level}")
+        parent_id = self.add_area(parent_level, parent_name)
+        child_key = (parent_name, child_name) if child_level == POLLING_STATION else child_name
+        child_id = self.add_area(child_level, child_key)
+        self._parents[(child_level, parent_level)][child_id] = parent_id
+        self._cache.clear()
+        return child_id
+
+    def id_of(self, level: str, key: AreaKey) -> Optional[int]:
+        return self._ids[level].get(key)
+
+    def name_of(self, level: str, area_id: int) -> AreaKey:
+        return self._names[level][area_id]
+
+    def names(self, level: str) -> List[AreaKey]:
+        return list(self._names[level])
+
+    def parent_array(self, level: str, parent_level: str) -> np.ndarray:
+        """the parent id of every node in level (NO_PARENT if unattached)"""
+        key = ("parents", level, parent_level)
+        if key not in self._cache:
+            self._cache[key] = np.asarray(self._parents[(level, parent_level)], dtype=np.int64)
+        return self._cache[key]
+
+    def csr(self, parent_level: str, level: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the (offsets, indices) child arrays for the parent_level -> level edges, where the children of
+        parent p are indices[offsets[p]:offsets[p + 1]] (in ascending child id order).
+        """
+        key = ("csr", parent_level, level)
+        if key not in self._cache:
+            parents = self.parent_array(level, parent_level)
+            attached = parents != NO_PARENT
+            counts = np.bincount(parents[attached], minlength=self.size(parent_level))
+            offsets = np.zeros(self.size(parent_level) + 1, dtype=np.int64)
+            np.cumsum(counts, out=offsets[1:])
+            indices = np.argsort(parents, kind="stable")[np.count_nonzero(~attached):]
+            self._cache[key] = (offsets, indices)
+        return self._cache[key]
+
+    def children(self, parent_level: str, parent_id: int, level: str) -> np.ndarray:
+        offsets, indices = self.csr(parent_level, level)
+        return indices[offsets[parent_id]:offsets[parent_id + 1]]
+
+    def ancestors(self, level: str, ids: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """
+        Resolves every ancestor level of the given node ids in one pass of array gathers.
+
+        Parameters
+            level: the level of the ids e.g. "PollingStation"
+            ids: node ids, defaults to every node in level
+        Returns
+            dict of ancestor level -> ancestor id per input id (NO_PARENT where the chain is broken), e.g.
+            {"LocalGovernmentArea": [...], "AdministrativeArea": [...], "Constituency": [...], "CountryArea": [...]}
+        """
+        if ids is None:
+            ids = np.arange(self.size(level), dtype=np.int64)
+        resolved = {level: np.asarray(ids, dtype=np.int64)}
+        frontier = [level]
+        while frontier:
+            child_level = frontier.pop()
+            for parent_level in PARENT_LEVELS[child_level]:
+                if parent_level in resolved:
+                    continue
+                resolved[parent_level] = _gather(self.parent_array(child_level, parent_level), resolved[child_level])
+                frontier.append(parent_level)
+        del resolved[level]
+        return resolved
+
+    def descendants(self, level: str, area_id: int, descendant_level: str = POLLING_STATION) -> np.ndarray:
+        """the ids of every descendant_level node below area_id e.g. all polling stations under AA1"""
+        ancestors = self.ancestors(descendant_level)
+        if level not in ancestors:
+            raise ValueError(f"{level} is not an ancestor level of {descendant_level}")
+        return np.flatnonzero(ancestors[level] == area_id)
+
+    def aggregate(self, values, level: str, source_level: str = POLLING_STATION) -> np.ndarray:
+        """
+        Sums per node values of source_level up to every node of level e.g. votes per polling station into votes
+        per constituency. values may be 1d (one value per node) or 2d (one row per node).
+        """
+        values = np.asarray(values)
+        owners = self.ancestors(source_level)[level]
+        attached = owners != NO_PARENT
+        out = np.zeros((self.size(level),) + values.shape[1:], dtype=np.result_type(values.dtype, np.int64))
+        np.add.at(out, owners[attached], values[attached])
+        return out
+
+
+def _gather(parents: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """parents[ids] that propagates NO_PARENT"""
+    out = np.full(ids.shape, NO_PARENT, dtype=np.int64)
+    valid = ids != NO_PARENT
+    out[valid] = parents[ids[valid]]
+    return out
@@ -1,11 +1,20 @@
-from areas import LocalGovernmentArea, CountryArea, AdministrativeArea, Constituency
-from political_party import CandidateLevel
+from candidate_level import CandidateLevel
 
 
-# a mapping used to pair candidate levels to area level classes
-level_area_mapping = {
-    CandidateLevel.PRESIDENT: CountryArea,
-    CandidateLevel.GOVERNOR: AdministrativeArea,
-    CandidateLevel.MAYOR: LocalGovernmentArea,
-    CandidateLevel.MP: Constituency,
+# a mapping used to pair candidate levels to area level class names (AreaClass.__name__), kept free of the area
+# classes themselves so that the registries can use it without importing areas (see areas.level_area_mapping)
+level_area_name_mapping = {
+    CandidateLevel.PRESIDENT: "CountryArea",
+    CandidateLevel.GOVERNOR: "AdministrativeArea",
+    CandidateLevel.MAYOR: "LocalGovernmentArea",
+    CandidateLevel.MP: "Constituency",
 }
+
+# a mapping between the level names used in client packets and candidate levels
+str_level_map = {
+    "president": CandidateLevel.PRESIDENT,
+    "mp": CandidateLevel.MP,
+    "mayor": CandidateLevel.MAYOR,
+    "governor": CandidateLevel.GOVERNOR,
+}
+level_str_map = {level: name for name, level in str_level_map.items()}
@@ -1,8 +1,12 @@
+import itertools
 from dataclasses import field, dataclass
 from typing import Dict
 
 from authentication import AuthenticationStrategy
-from political_party import CandidateLevel
+from candidate_level import CandidateLevel
+
+# hands out voter ids that are unique for the life of the process (id(self) is reused once a voter is collected)
+_voter_ids = itertools.count()
 
 
 @dataclass
@@ -42,13 +46,17 @@ class Voter:
     _votes: Dict[CandidateLevel, str] = field(default_factory=dict)
 
     def __post_init__(self):
-        self.voter_id = id(self)
+        self.voter_id = next(_voter_ids)
 
     def authenticate(self):
         if not self.authentication_strategy.authenticate():
             return False
         return True
 
+    def is_authenticated(self) -> bool:
+        """authenticates without any output (see AuthenticationStrategy.is_valid)"""
+        return self.authentication_strategy.is_valid()
+
     @property
     def votes(self):
         return self._votes
@@ -56,3 +64,13 @@ class Voter:
     @votes.setter
     def votes(self, votes):
         self._votes = votes
+
+
+def reserve_voter_ids(up_to: int):
+    """
+    makes sure voters created from now on get ids of at least up_to, used when voter ids committed by another
+    process (e.g. a replication primary) are taken over so new voters cannot collide with them
+    """
+    global _voter_ids
+    next_id = next(_voter_ids)
+    _voter_ids = itertools.count(max(next_id, up_to))